@@ -1,9 +1,10 @@
 # app.py — Streamlit Chat Interface for DocIntel Bot
+import json
 import streamlit as st
-from src.document_processor import DocumentProcessor
-from src.vector_store import VectorStore
 from src.chatbot import QueryEngine
-import os
+from src.conversation import Conversation
+from src.ingest_worker import IngestionWorker
+from src.metrics import STAGES, get_registry
 
 st.set_page_config(page_title="DocIntel Chatbot", page_icon="🤖", layout="wide")
 
@@ -16,11 +17,29 @@ if "engine" not in st.session_state:
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "conversation" not in st.session_state:
+    st.session_state.conversation = Conversation.from_config()
+
 # ----------------------------------------------------
 # SIDEBAR - Document Management
 # ----------------------------------------------------
 st.sidebar.title("📂 Document Control Panel")
 
+
+@st.cache_resource
+def get_ingestion_worker():
+    """One background ingestion worker shared by every session"""
+    return IngestionWorker().start()
+
+
+worker = get_ingestion_worker()
+
+if "submitted_uploads" not in st.session_state:
+    st.session_state.submitted_uploads = set()
+
+if "index_version" not in st.session_state:
+    st.session_state.index_version = worker.index_version
+
 uploaded_files = st.sidebar.file_uploader(
     "Upload your documents (PDF or TXT)",
     type=["pdf", "txt"],
@@ -28,23 +47,91 @@ uploaded_files = st.sidebar.file_uploader(
 )
 
 if uploaded_files:
-    os.makedirs("data/documents", exist_ok=True)
+    queued = 0
     for uploaded_file in uploaded_files:
-        with open(os.path.join("data/documents", uploaded_file.name), "wb") as f:
-            f.write(uploaded_file.read())
-    st.sidebar.success(f"✅ {len(uploaded_files)} document(s) uploaded successfully!")
+        # The uploader returns the same files on every rerun; submit each one once
+        upload_key = (uploaded_file.name, uploaded_file.size)
+        if upload_key in st.session_state.submitted_uploads:
+            continue
+        st.session_state.submitted_uploads.add(upload_key)
+
+        job_id, duplicate = worker.submit_upload(uploaded_file)
+        if duplicate:
+            st.sidebar.info(f"♻️ {uploaded_file.name} was already ingested (job #{job_id})")
+        else:
+            queued += 1
+    if queued:
+        st.sidebar.success(f"✅ {queued} document(s) queued for ingestion")
 
 if st.sidebar.button("⚙️ Build Knowledge Base"):
-    with st.spinner("Extracting text and building FAISS index..."):
-        processor = DocumentProcessor()
-        chunks, metadata = processor.process_all_documents()
+    job_id = worker.request_rebuild()
+    st.sidebar.success(f"✅ Rebuild queued (job #{job_id}) — you can keep chatting meanwhile.")
+
+
+def _auto_refresh(fn):
+    # st.fragment (Streamlit >= 1.37) reruns just this panel every few seconds
+    fragment = getattr(st, "fragment", None)
+    return fragment(run_every=2)(fn) if fragment else fn
+
+
+@_auto_refresh
+def render_ingest_jobs():
+    jobs = worker.db.get_ingest_jobs(limit=5)
+    if not jobs:
+        return
+
+    st.markdown("**📥 Ingestion jobs**")
+    for job_id, filename, status, progress, message, size_bytes, upload_seconds, *_ in jobs:
+        label = f"#{job_id} {filename} — {status}"
+        if size_bytes and upload_seconds:
+            label += f" · upload {size_bytes / 1e6 / upload_seconds:.1f} MB/s"
+        st.progress(min(max(progress or 0.0, 0.0), 1.0), text=label)
+        if message:
+            st.caption(message)
+
+    # A job finished: rerun the whole app so this session picks up the new index
+    if worker.index_version != st.session_state.index_version:
+        st.rerun()
+
+
+with st.sidebar:
+    render_ingest_jobs()
+
+# ----------------------------------------------------
+# ADMIN - Pipeline latency
+# ----------------------------------------------------
+show_admin = st.sidebar.checkbox("📊 Show pipeline latency (admin)")
+
+
+def render_latency_panel():
+    import pandas as pd
+
+    st.subheader("📊 Pipeline latency")
+    summary = get_registry().summary()
+    if not summary:
+        st.info("No queries timed yet in this process.")
+    else:
+        live = pd.DataFrame({
+            stage: {key: stats[key] * 1000 for key in ("p50", "p95", "p99")}
+            for stage, stats in summary.items()
+        }).T
+        st.caption(f"Live percentiles (ms) over the last {get_registry().window} queries per stage")
+        st.bar_chart(live)
+        st.dataframe(live.assign(count=[s["count"] for s in summary.values()]).round(1))
+
+    # History flushed to system_metrics every metrics.flush_interval seconds. Each process
+    # (Streamlit, every server worker) flushes its own percentiles, so plot one line per pid
+    stage = st.selectbox("Stage", STAGES, index=STAGES.index("total"))
+    rows = worker.db.get_metrics(f"latency.{stage}.p95", limit=500)
+    if rows:
+        history = pd.DataFrame({
+            "time": pd.to_datetime([row[0] for row in rows]),
+            "pid": [f"pid {json.loads(row[3] or '{}').get('pid', '?')}" for row in rows],
+            "p95": [row[2] for row in rows],
+        }).pivot_table(index="time", columns="pid", values="p95").sort_index().ffill()
+        st.caption(f"{stage} p95 latency history (ms), per process")
+        st.line_chart(history)
 
-        if not chunks:
-            st.sidebar.error("❌ No text extracted — please check your uploaded documents.")
-        else:
-            store = VectorStore()
-            store.build_index(chunks, metadata)
-            st.sidebar.success("✅ Knowledge Base (FAISS Index) built successfully!")
 
 # ----------------------------------------------------
 # MAIN CHAT UI
@@ -52,6 +139,17 @@ if st.sidebar.button("⚙️ Build Knowledge Base"):
 st.title("🤖 DocIntel Chatbot")
 st.markdown("Ask questions about your uploaded documents below 👇")
 
+if show_admin:
+    with st.expander("Admin panel", expanded=True):
+        render_latency_panel()
+
+# Swap in the index rebuilt by the background worker
+if st.session_state.index_version != worker.index_version:
+    st.session_state.index_version = worker.index_version
+    if st.session_state.engine is not None:
+        st.session_state.engine.reload_index()
+        st.toast("🔄 Knowledge base updated.")
+
 # Initialize QueryEngine only once
 if st.session_state.engine is None:
     try:
@@ -60,6 +158,11 @@ if st.session_state.engine is None:
     except Exception as e:
         st.error(f"❌ Error initializing chatbot: {e}")
 
+# Start over: forget this session's messages, recent turns and summary
+if st.sidebar.button("🧹 New conversation"):
+    st.session_state.messages = []
+    st.session_state.conversation.clear()
+
 # Display conversation
 for msg in st.session_state.messages:
     role, text = msg["role"], msg["text"]
@@ -78,7 +181,10 @@ if user_query:
     if st.session_state.engine:
         with st.spinner("Thinking..."):
             try:
-                answer = st.session_state.engine.answer_query(user_query)
+                result = st.session_state.engine.answer_in_conversation(
+                    user_query, st.session_state.conversation
+                )
+                answer = result["answer"]
                 st.session_state.messages.append({"role": "assistant", "text": answer})
                 st.chat_message("assistant").markdown(f"🤖 {answer}")
             except Exception as e:
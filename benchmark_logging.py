@@ -0,0 +1,73 @@
+# benchmark_logging.py — cost of a log call on the request thread
+#
+# Compares the queue-backed DocIntel logger with a plain synchronous FileHandler,
+# and reports the estimated logging overhead per query. An enqueued INFO record costs
+# about as much as a synchronous write (the LogRecord dominates); the big saving
+# comes from per-query messages being DEBUG, which are filtered before a record exists.
+#
+# Usage:
+#   python benchmark_logging.py --calls 20000
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from logger import configure_logging, get_logger, stop_logging
+
+# Log calls one query used to make at INFO before the hot-path messages were moved to DEBUG
+CALLS_PER_QUERY = 6
+
+
+def time_calls(logger, calls, level):
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.log(level, "🔍 Retrieved top %d chunks for query %d.", 3, i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def synchronous_logger(path):
+    logger = logging.getLogger("benchmark.sync")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
+    ))
+    logger.addHandler(handler)
+    return logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-call logging overhead")
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Keep the benchmark records off the console and out of the real log file
+    tmp_dir = Path(tempfile.mkdtemp())
+    configure_logging(log_file=str(tmp_dir / "queued.log"), console_level="WARNING")
+
+    queued = get_logger("benchmark.queued")
+    queued.filters.clear()  # measure raw enqueue cost, not the rate limiter dropping records
+    sync = synchronous_logger(tmp_dir / "sync.log")
+
+    results = {
+        "sync FileHandler, INFO": time_calls(sync, args.calls, logging.INFO),
+        "queued, INFO (written)": time_calls(queued, args.calls, logging.INFO),
+        "queued, DEBUG (filtered)": time_calls(queued, args.calls, logging.DEBUG),
+    }
+
+    drain_start = time.perf_counter()
+    stop_logging()
+    drain = time.perf_counter() - drain_start
+
+    print(f"\n📊 {args.calls} log calls per mode (request-thread cost)\n")
+    for mode, micros in results.items():
+        print(f"   {mode:<28} {micros:8.2f} µs/call   ~{micros * CALLS_PER_QUERY:8.1f} µs/query")
+    print(f"\n   Listener drained the backlog in {drain:.2f}s (off the request path)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmark_retrieval.py — flat vs coarse-to-fine (centroid) chunk search
+#
+# Usage:
+#   python benchmark_retrieval.py                      # synthetic corpus
+#   python benchmark_retrieval.py --docs 5000 --chunks-per-doc 40
+#   python benchmark_retrieval.py --use-index          # vectors from the live index build
+
+import argparse
+import os
+import pickle
+import time
+
+import faiss
+import numpy as np
+
+from src.hierarchical_index import build_centroid_index, hierarchical_search
+
+
+def synthetic_corpus(n_docs, chunks_per_doc, dim, noise=2.5, seed=0):
+    """
+    Clustered vectors: each document is a topic centre with noisy chunks around it.
+    At noise <= 1 the clusters are trivially separable and recall is 1.0 at any M;
+    the default makes neighbouring documents overlap, as real topics do.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(n_docs, dim)).astype("float32")
+    embeddings = np.repeat(centres, chunks_per_doc, axis=0)
+    embeddings += rng.normal(scale=noise, size=embeddings.shape).astype("float32")
+    metadata = [
+        {"document": f"doc_{d}.pdf", "page": 1 + c // 4, "chunk_id": c}
+        for d in range(n_docs) for c in range(chunks_per_doc)
+    ]
+    return embeddings, metadata
+
+
+def indexed_corpus():
+    from src.vector_store import current_build_dir  # loads the embedding stack; only needed here
+    build_dir = current_build_dir() or "data"  # "data" holds indexes built before versioning
+    index = faiss.read_index(os.path.join(build_dir, "faiss_index.bin"))
+    with open(os.path.join(build_dir, "chunks_metadata.pkl"), "rb") as f:
+        metadata = pickle.load(f)
+    return index.reconstruct_n(0, index.ntotal), metadata
+
+
+def make_queries(embeddings, n_queries, seed=1):
+    """Perturbed copies of random chunk vectors"""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = embeddings[picks] + rng.normal(scale=0.3, size=(len(picks), embeddings.shape[1]))
+    return queries.astype("float32")
+
+
+def timed(search_fn, queries):
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, indices = search_fn(q.reshape(1, -1))
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(set(int(i) for i in indices[0] if i >= 0))
+    return np.array(latencies), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency/recall curve of hierarchical retrieval")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--chunks-per-doc", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--noise", type=float, default=2.5,
+                        help="Chunk spread around each document centre (higher = more overlap)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--level", choices=["document", "page"], default="document")
+    parser.add_argument("--fanouts", default="1,4,16,64,256")
+    parser.add_argument("--use-index", action="store_true", help="Benchmark the built FAISS index")
+    args = parser.parse_args()
+
+    if args.use_index:
+        embeddings, metadata = indexed_corpus()
+    else:
+        embeddings, metadata = synthetic_corpus(args.docs, args.chunks_per_doc, args.dim, args.noise)
+
+    chunk_index = faiss.IndexFlatL2(embeddings.shape[1])
+    chunk_index.add(embeddings)
+    centroid_index, groups = build_centroid_index(embeddings, metadata, args.level)
+    queries = make_queries(embeddings, args.queries)
+
+    print(f"\n📊 {chunk_index.ntotal} chunks, {centroid_index.ntotal} {args.level} centroids, "
+          f"{len(queries)} queries, top_k={args.top_k}\n")
+
+    flat_lat, flat_results = timed(lambda q: chunk_index.search(q, args.top_k), queries)
+    print(f"{'mode':<14}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}{'recall@k':>10}")
+    print(f"{'flat':<14}{np.percentile(flat_lat, 50):>10.3f}{np.percentile(flat_lat, 95):>10.3f}"
+          f"{1.0:>10.2f}{1.0:>10.3f}")
+
+    for fanout in (int(m) for m in args.fanouts.split(",")):
+        if fanout > centroid_index.ntotal:
+            break
+        lat, results = timed(
+            lambda q: hierarchical_search(chunk_index, centroid_index, groups, q, args.top_k, fanout),
+            queries
+        )
+        recall = np.mean([len(r & f) / max(1, len(f)) for r, f in zip(results, flat_results)])
+        speedup = np.percentile(flat_lat, 50) / max(np.percentile(lat, 50), 1e-9)
+        print(f"{'M=' + str(fanout):<14}{np.percentile(lat, 50):>10.3f}{np.percentile(lat, 95):>10.3f}"
+              f"{speedup:>10.2f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,14 @@ if not chunks:
 
 print(f"\n✅ Extracted {len(chunks)} chunks from documents.")
 
+report = processor.last_report
+if report.get("duplicates_removed"):
+    print(f"🧹 Removed {report['duplicates_removed']} near-duplicate chunks "
+          f"({report['chunks_before']} → {report['chunks_after']}, "
+          f"{report['reduction_pct']:.1f}% smaller index)")
+    for name in report["duplicate_documents"]:
+        print(f"   • {name} is a near-duplicate of already indexed documents")
+
 # Step 2️⃣: Build FAISS index
 store = VectorStore()  # Model loads automatically in __init__()
 store.build_index(chunks, metadata)
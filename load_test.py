@@ -0,0 +1,101 @@
+# load_test.py — closed-loop load generator for the HTTP query service (src/server.py)
+#
+# Usage:
+#   python -m src.server --workers 4 &
+#   python load_test.py --endpoint /retrieve --concurrency 16 --duration 30
+#   python load_test.py --endpoint /query --questions questions.txt
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+DEFAULT_QUESTIONS = [
+    "What is TechVision Solutions' mission?",
+    "Which services does the company offer?",
+    "Who are the main clients?",
+    "What was the revenue last year?",
+    "Where is the headquarters located?",
+]
+
+
+def worker(host, port, endpoint, questions, deadline, latencies, statuses, lock, worker_id):
+    """One client with a persistent keep-alive connection, sending requests back to back"""
+    conn = http.client.HTTPConnection(host, port, timeout=120)
+    key = "question" if endpoint == "/query" else "query"
+    i = worker_id
+
+    while time.perf_counter() < deadline:
+        question = questions[i % len(questions)]
+        i += 1
+        body = {"queries": [question]} if endpoint == "/batch" else {key: question}
+
+        start = time.perf_counter()
+        try:
+            conn.request("POST", endpoint, json.dumps(body), {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=120)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+        if status == 429:
+            time.sleep(0.05)
+
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure RPS and tail latency of the query service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--endpoint", choices=["/query", "/retrieve", "/batch"], default="/retrieve")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--questions", help="Text file with one question per line")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args.host, args.port, args.endpoint, questions,
+                                              deadline, latencies, statuses, lock, n))
+        for n in range(args.concurrency)
+    ]
+
+    print(f"\n🚀 {args.concurrency} clients → http://{args.host}:{args.port}{args.endpoint} for {args.duration:.0f}s")
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    total = sum(statuses.values())
+    print(f"\n📊 {total} requests in {wall:.1f}s — {total / wall:.1f} req/s, "
+          f"{len(latencies) / wall:.1f} successful req/s")
+    print("   Status codes: " + ", ".join(f"{code}={count}" for code, count in sorted(statuses.items(), key=str)))
+    if latencies:
+        lat = np.array(latencies)
+        print(f"   Latency ms: p50={np.percentile(lat, 50):.1f}  p95={np.percentile(lat, 95):.1f}  "
+              f"p99={np.percentile(lat, 99):.1f}  max={lat.max():.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 """
 Logger package initialization
 """
-from .logger_system import setup_logger, get_logger
+from .logger_system import setup_logger, get_logger, configure_logging, stop_logging
 
-__all__ = ["setup_logger", "get_logger"]
+__all__ = ["setup_logger", "get_logger", "configure_logging", "stop_logging"]
@@ -1,54 +1,254 @@
 """
 Logging system for DocIntel Bot (UTF-8 Safe)
+
+All loggers share one queue-backed backend: callers only enqueue records,
+and a single QueueListener thread formats and writes them to a size-rotated
+JSON log file and the console, so a slow disk or rotation never stalls a request.
+Creating and enqueueing a record still costs about as much as a plain file
+write (see benchmark_logging.py); hot-path messages are cheap because they are
+DEBUG and filtered out before a record is created. Forked worker processes write to their own
+file (docintel.<pid>.log), since rotation is not safe across processes.
 """
+import atexit
+import json
 import logging
+import os
+import queue
+import random
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 from logger.config_manager import ConfigManager
 
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra={...}` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "file": f"{record.filename}:{record.lineno}",
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token-bucket rate limit plus random sampling for one logger's INFO/DEBUG records.
+    WARNING and above always pass; the number of dropped records is attached
+    to the next record that gets through as `suppressed`.
+    """
+
+    def __init__(self, rate: float = 20.0, burst: int = 50, sample_rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.sample_rate = sample_rate
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return self._attach_suppressed(record)
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return self._drop()
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1.0:
+                self._suppressed += 1
+                return False
+            self._tokens -= 1.0
+        return self._attach_suppressed(record)
+
+    def _drop(self) -> bool:
+        with self._lock:
+            self._suppressed += 1
+        return False
+
+    def _attach_suppressed(self, record: logging.LogRecord) -> bool:
+        if self._suppressed:
+            with self._lock:
+                record.suppressed, self._suppressed = self._suppressed, 0
+        return True
+
+
+# Immutable %-args that are safe to format later, on the listener thread
+_SCALAR_ARGS = (str, bytes, int, float, bool, type(None))
+
+
+class _DirectQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record mostly untouched; formatting happens on the listener thread.
+    Records whose args include anything but scalars (lists, dicts, objects) are formatted here,
+    so a caller mutating the object afterwards cannot change or break the logged message.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and (not isinstance(args, tuple) or not all(isinstance(a, _SCALAR_ARGS) for a in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class _Backend:
+    """Process-wide queue, handler and listener shared by every DocIntel logger"""
+
+    # Settings that configure_logging() may override
+    SETTINGS = ("log_file", "max_bytes", "backup_count", "console_level", "file_format")
+
+    def __init__(self, **overrides):
+        config = ConfigManager()
+        self.log_file = config.get('logging.file', 'logs/docintel.log')
+        self.max_bytes = int(config.get('logging.max_bytes', 10 * 1024 * 1024))
+        self.backup_count = int(config.get('logging.backup_count', 5))
+        self.console_level = config.get('logging.console_level', 'INFO')
+        self.file_format = config.get('logging.format', 'json')
+        self._apply(overrides)
+
+        self.queue = queue.SimpleQueue()
+        self.handler = _DirectQueueHandler(self.queue)
+        self.listener = None
+        self.start()
+
+    def _apply(self, overrides):
+        unknown = set(overrides) - set(self.SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown logging setting(s): {', '.join(sorted(unknown))}")
+        for name, value in overrides.items():
+            setattr(self, name, value)
+        Path(self.log_file).parent.mkdir(parents=True, exist_ok=True)
+
+    def reconfigure(self, **overrides):
+        """Drain the queue, apply the overrides and restart the listener with new handlers"""
+        self.stop()
+        self._apply(overrides)
+        self.start()
+
+    def _handlers(self):
+        # File handler (UTF-8 safe, size-based rotation)
+        file_handler = RotatingFileHandler(
+            self.log_file, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        if self.file_format == 'json':
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+            ))
+
+        # Console handler (UTF-8 safe)
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(getattr(logging, self.console_level.upper(), logging.INFO))
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        # ✅ Prevent UnicodeEncodeError on Windows
+        try:
+            console_handler.stream.reconfigure(encoding='utf-8')
+        except Exception:
+            pass
+
+        return file_handler, console_handler
+
+    def start(self):
+        self.listener = QueueListener(self.queue, *self._handlers(), respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+    def after_fork_in_child(self):
+        # The listener thread does not survive fork(); give the child its own queue and thread
+        for handler in self.listener.handlers if self.listener else ():
+            handler.close()
+        # Separate RotatingFileHandlers on one file would rotate over each other's backups
+        path = Path(self.log_file)
+        self.log_file = str(path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}"))
+        self.queue = queue.SimpleQueue()
+        self.handler.queue = self.queue
+        self.start()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _get_backend(**overrides) -> _Backend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _Backend(**overrides)
+            atexit.register(_backend.stop)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=_backend.after_fork_in_child)
+    return _backend
+
+
+def configure_logging(**overrides) -> None:
+    """
+    Override backend settings for this process only (log_file, console_level, file_format,
+    max_bytes, backup_count), leaving the shared ConfigManager values untouched.
+    """
+    with _backend_lock:
+        backend = _backend
+    if backend is None:
+        _get_backend(**overrides)
+    else:
+        backend.reconfigure(**overrides)
+
+
+def stop_logging() -> None:
+    """Drain the log queue and close the log files (call before os._exit())"""
+    if _backend is not None:
+        _backend.stop()
+
 
 def setup_logger(name: str = "docintel") -> logging.Logger:
     """Setup and configure logger (handles Windows UTF-8 issue)"""
 
     config = ConfigManager()
     log_level = config.get('logging.level', 'INFO')
-    log_file = config.get('logging.file', 'logs/docintel.log')
-
-    # Create logs directory
-    log_path = Path(log_file)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
+    backend = _get_backend()
 
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
     logger.handlers.clear()
+    logger.filters.clear()
+    logger.propagate = False
 
-    # Formatters
-    detailed_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-    )
-    simple_formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s'
-    )
-
-    # File handler (UTF-8 safe)
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(detailed_formatter)
-    logger.addHandler(file_handler)
-
-    # Console handler (UTF-8 safe)
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(simple_formatter)
-
-    # ✅ Prevent UnicodeEncodeError on Windows
-    try:
-        console_handler.stream.reconfigure(encoding='utf-8')
-    except Exception:
-        pass
-
-    logger.addHandler(console_handler)
+    # Per-logger rate limiting / sampling of INFO and DEBUG messages
+    logger.addFilter(RateLimitFilter(
+        rate=float(config.get('logging.rate_limit.per_second', 20)),
+        burst=int(config.get('logging.rate_limit.burst', 50)),
+        sample_rate=float(config.get('logging.rate_limit.sample_rate', 1.0))
+    ))
+    logger.addHandler(backend.handler)
 
     return logger
 
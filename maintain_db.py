@@ -0,0 +1,24 @@
+# maintain_db.py — retention job for data/docintel.db (safe to run from cron / Task Scheduler)
+#
+# Usage:
+#   python maintain_db.py                       # roll up metrics older than database.metrics_retention_days
+#   python maintain_db.py --older-than-days 1 --vacuum
+
+import argparse
+from src.database import Database
+from logger.config_manager import ConfigManager
+
+config = ConfigManager()
+parser = argparse.ArgumentParser(description="Roll old system_metrics rows into hourly summaries")
+parser.add_argument("--older-than-days", type=int,
+                    default=int(config.get("database.metrics_retention_days", 7)))
+parser.add_argument("--vacuum", action="store_true", help="Compact the database file afterwards")
+args = parser.parse_args()
+
+db = Database()
+rolled_up = db.rollup_metrics(args.older_than_days)
+print(f"\n✅ Rolled up {rolled_up} metric rows older than {args.older_than_days} day(s) into hourly summaries.")
+
+if args.vacuum:
+    db.vacuum()
+    print("✅ Database compacted.")
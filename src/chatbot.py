@@ -2,69 +2,256 @@
 Chatbot Query Engine — integrates FAISS retrieval + Groq LLM response generation
 """
 
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from src.vector_store import VectorStore
 from src.llm_engine import LLMEngine
 from src.database import Database
+from src.hierarchical_index import hierarchical_search
+from src.metrics import get_registry
+from src.conversation import Conversation, truncate_to_tokens
 from logger import get_logger
+from logger.config_manager import ConfigManager
 
 
 class QueryEngine:
-    def __init__(self):
+    def __init__(self, llm=None):
         self.logger = get_logger(__name__)
         self.store = VectorStore()
-        self.llm = LLMEngine()
+        # Any object with generate(prompt, max_tokens=512) -> str can stand in for the Groq engine
+        self.llm = llm or LLMEngine()
         self.db = Database()
-        self.index, self.metadata = self.store.load_index()
+        self.metrics = get_registry()
+
+        # Coarse-to-fine retrieval: search only the chunks of the top-M documents
+        config = ConfigManager()
+        self.doc_fanout = int(config.get("retrieval.hierarchical.fanout", 8))
+
+        # Conversation-aware querying (see answer_in_conversation)
+        self.max_context_chunks = int(config.get("conversation.max_context_chunks", 6))
+        self.always_rewrite = bool(config.get("conversation.always_rewrite", False))
+        self._summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+
+        self.reload_index()
         self.logger.info("✅ QueryEngine initialized successfully.")
 
+    def reload_index(self):
+        """(Re)load the FAISS indexes from disk, e.g. after a background rebuild"""
+        index, metadata = self.store.load_index()
+        # Leftover centroid files are ignored once retrieval.hierarchical.enabled is false
+        if self.store.hierarchical:
+            centroid_index, centroid_groups = self.store.load_centroid_index()
+        else:
+            centroid_index, centroid_groups = None, None
+
+        # Load everything first, then swap, so queries never hit a half-loaded index
+        self.index, self.metadata = index, metadata
+        self.index_version = self.store.index_version
+        self.centroid_index, self.centroid_groups = centroid_index, centroid_groups
+
     # ---------------------------------------------------
     # 1️⃣ Retrieve relevant chunks from FAISS
     # ---------------------------------------------------
     def retrieve_relevant_chunks(self, query, top_k=3):
-        query_emb = self.store.generate_embeddings([query])
-        distances, indices = self.index.search(query_emb, top_k)
+        with self.metrics.span("embed"):
+            query_emb = self.store.generate_embeddings([query])
+        with self.metrics.span("search"):
+            results = self._search(query_emb, top_k)
+
+        self.logger.debug("🔍 Retrieved top %d chunks for query.", top_k)
+        return results
+
+    def retrieve_relevant_chunks_batch(self, queries, top_k=3):
+        """Retrieve chunks for several queries with a single embedding pass"""
+        with self.metrics.span("embed"):
+            query_embs = self.store.generate_embeddings(list(queries))
+        with self.metrics.span("search"):
+            results = [self._search(query_embs[i:i + 1], top_k) for i in range(len(query_embs))]
+
+        self.logger.debug("🔍 Retrieved top %d chunks for %d queries.", top_k, len(results))
+        return results
+
+    def _search(self, query_emb, top_k):
+        if self.centroid_index is not None and 0 < self.doc_fanout < self.centroid_index.ntotal:
+            distances, indices = hierarchical_search(
+                self.index, self.centroid_index, self.centroid_groups,
+                query_emb, top_k, self.doc_fanout
+            )
+        else:
+            distances, indices = self.index.search(query_emb, top_k)
 
         results = []
         for i, idx in enumerate(indices[0]):
-            result = self.metadata[idx]
+            if idx < 0:  # fewer candidates than top_k
+                continue
+            # Copy, so concurrent queries don't overwrite each other's scores
+            result = dict(self.metadata[idx])
             result["score"] = 1.0 / (1.0 + distances[0][i])
             results.append(result)
-
-        self.logger.info(f"🔍 Retrieved top {top_k} chunks for query.")
         return results
 
     # ---------------------------------------------------
     # 2️⃣ Generate an answer using Groq LLM
     # ---------------------------------------------------
-    def generate_answer(self, query, context_chunks):
-        context_text = "\n".join([chunk["text"] for chunk in context_chunks])
-        prompt = f"""
+    def generate_answer(self, query, context_chunks, history=None):
+        with self.metrics.span("context"):
+            context_text = "\n".join([chunk["text"] for chunk in context_chunks])
+            history_text = f"\n        Conversation so far:\n        {history}\n" if history else ""
+            prompt = f"""
         You are an AI assistant answering questions based on document content.
         Context:
         {context_text}
-        
+        {history_text}
         Question: {query}
         Answer:
         """
 
-        answer = self.llm.generate(prompt)
+        with self.metrics.span("llm"):
+            answer = self.llm.generate(prompt)
         return answer
 
     # ---------------------------------------------------
     # 3️⃣ Full pipeline: retrieve + reason + store
     # ---------------------------------------------------
-    def answer_query(self, query):
-        self.logger.info(f"🤖 Received query: {query}")
-        retrieved = self.retrieve_relevant_chunks(query)
+    def run_query(self, query, top_k=3, log=True):
+        """
+        Retrieve, generate and (unless log=False) record the interaction and metrics.
+        Returns the answer together with its citations.
+        """
+        self.logger.debug("🤖 Received query: %s", query)
+        start = time.perf_counter()
+        retrieved = self.retrieve_relevant_chunks(query, top_k)
         answer = self.generate_answer(query, retrieved)
+        execution_time = self._record(query, retrieved, answer, start, log)
 
-        # Log the interaction in DB
-        self.db.log_interaction(query, retrieved, answer, citations=retrieved)
+        return {"question": query, "answer": answer, "citations": retrieved,
+                "execution_time": execution_time}
 
+    def _record(self, query, chunks, answer, start, log=True):
+        """Log the interaction in DB (unless log=False) and record the total latency"""
+        execution_time = time.perf_counter() - start
+        if log:
+            with self.metrics.span("db_write"):
+                self.db.log_interaction(query, chunks, answer, citations=chunks,
+                                        execution_time=execution_time,
+                                        index_version=self.index_version)
+        self.metrics.observe("total", time.perf_counter() - start)
+        if log:
+            self.metrics.maybe_flush(self.db)
+        return execution_time
+
+    def answer_query(self, query):
+        answer = self.run_query(query)["answer"]
         print("\n🧠 Answer:\n", answer)
         return answer
 
+    # ---------------------------------------------------
+    # 4️⃣ Multi-turn: rewrite follow-ups, bounded memory
+    # ---------------------------------------------------
+    # Pronouns that point back at something said earlier ...
+    _ANAPHORA = re.compile(
+        r"\b(it|its|they|them|their|theirs|he|him|his|she|hers?|"
+        r"the (former|latter|same|above|previous( one)?))\b(?!-)",
+        re.IGNORECASE
+    )
+    # ... and fragments that only make sense as a continuation ("and for 2023?", "what about X?")
+    _ELLIPSIS = re.compile(
+        r"^\s*(and|but|also|or|so|then|what about|how about|what else|why not|same)\b",
+        re.IGNORECASE
+    )
+
+    def answer_in_conversation(self, query, conversation: Conversation, top_k=3):
+        """
+        Answer a follow-up within a conversation. The question is rewritten into a
+        standalone retrieval query, chunks from recent turns are reused, and the
+        prompt carries only the bounded summary + recent turns, so prompt size stays
+        flat as the conversation grows.
+        """
+        conversation.wait_for_summary()
+        start = time.perf_counter()
+
+        standalone = query
+        if conversation.has_history and (self.always_rewrite or self._needs_rewrite(query)):
+            with self.metrics.span("rewrite"):
+                standalone = self.rewrite_query(query, conversation)
+
+        retrieved = self.retrieve_relevant_chunks(standalone, top_k)
+        context_chunks = self._merge_chunks(retrieved, conversation.recent_chunks())
+        answer = self.generate_answer(query, context_chunks, history=conversation.render_history())
+        # Reused chunks went into the prompt too, so they are cited alongside the fresh ones
+        execution_time = self._record(query, context_chunks, answer, start)
+
+        conversation.add_turn(query, answer, retrieved)
+        overflow = conversation.overflow()
+        if overflow:
+            # Fold old turns into the summary off the request path; the next turn waits for it
+            conversation.set_pending_summary(
+                self._summary_pool.submit(self._fold_into_summary, conversation, overflow)
+            )
+
+        return {"question": query, "standalone_query": standalone, "answer": answer,
+                "citations": context_chunks, "execution_time": execution_time}
+
+    def _needs_rewrite(self, query):
+        # Only questions that refer back to earlier turns pay for the rewrite round trip
+        return bool(self._ANAPHORA.search(query) or self._ELLIPSIS.match(query))
+
+    def rewrite_query(self, query, conversation: Conversation):
+        """Turn a follow-up question into a standalone search query using the conversation"""
+        prompt = f"""
+        Rewrite the follow-up question as a single standalone search query that can be
+        understood without the conversation. Resolve pronouns and references.
+        Reply with the query only.
+
+        Conversation:
+        {conversation.render_history(answer_chars=200)}
+
+        Follow-up question: {query}
+        Standalone query:
+        """
+        try:
+            rewritten = self.llm.generate(prompt, max_tokens=64).strip().strip('"')
+        except Exception as e:
+            self.logger.warning(f"⚠️ Query rewrite failed, using the original question: {e}")
+            return query
+        self.logger.debug("✏️ Rewrote %r as %r", query, rewritten)
+        return rewritten or query
+
+    def _merge_chunks(self, retrieved, recent):
+        """Fresh results first, then chunks from recent turns, without duplicates"""
+        merged, seen = [], set()
+        for chunk in retrieved + recent:
+            key = (chunk.get("document"), chunk.get("page"), chunk.get("chunk_id"))
+            if key not in seen:
+                seen.add(key)
+                merged.append(chunk)
+            if len(merged) >= self.max_context_chunks:
+                break
+        return merged
+
+    def _fold_into_summary(self, conversation: Conversation, turns):
+        turns_text = "\n".join(
+            f"User: {t['question']}\nAssistant: {truncate_to_tokens(t['answer'], 150)}" for t in turns
+        )
+        prompt = f"""
+        Update the running summary of a conversation about some documents.
+        Keep the entities, numbers and topics the user cares about. At most
+        {conversation.summary_max_tokens * 3 // 4} words.
+
+        Current summary:
+        {conversation.summary or "(empty)"}
+
+        New turns:
+        {turns_text}
+
+        Updated summary:
+        """
+        with self.metrics.span("summarize"):
+            summary = self.llm.generate(prompt, max_tokens=conversation.summary_max_tokens)
+        conversation.update_summary(summary, turns)
+
 
 # ---------------------------------------------------
 # 🧪 Test it standalone
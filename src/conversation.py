@@ -0,0 +1,130 @@
+"""
+Bounded multi-turn conversation memory — recent turns verbatim, older turns in a rolling summary
+"""
+import threading
+from typing import Dict, List
+from logger import get_logger
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting prompts"""
+    return len(text or "") // 4 + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, on a word boundary"""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+class Conversation:
+    """
+    Per-session chat memory with a fixed prompt budget.
+    The last few turns are kept verbatim; turns pushed out of that window are
+    folded (by QueryEngine, in the background) into a summary capped at
+    summary_max_tokens, so prompts stay the same size however long the chat gets.
+    Turns are only dropped once the summary that covers them has been applied.
+    """
+
+    def __init__(self, max_recent_turns: int = 3, history_max_tokens: int = 600,
+                 summary_max_tokens: int = 200, reuse_turns: int = 2):
+        self.max_recent_turns = max_recent_turns
+        self.history_max_tokens = history_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.reuse_turns = reuse_turns
+
+        self.turns: List[Dict] = []
+        self.summary = ""
+        self.turn_count = 0
+        self.logger = get_logger(__name__)
+        self._pending = None  # Future of an in-progress summary update
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "Conversation":
+        from logger.config_manager import ConfigManager
+        config = ConfigManager()
+        return cls(
+            max_recent_turns=int(config.get("conversation.max_recent_turns", 3)),
+            history_max_tokens=int(config.get("conversation.history_max_tokens", 600)),
+            summary_max_tokens=int(config.get("conversation.summary_max_tokens", 200)),
+            reuse_turns=int(config.get("conversation.reuse_turns", 2))
+        )
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.turns or self.summary)
+
+    # ----------------------------------------------------------------------
+    # TURNS
+    # ----------------------------------------------------------------------
+
+    def add_turn(self, question: str, answer: str, chunks: List[Dict]) -> None:
+        with self._lock:
+            self.turns.append({"question": question, "answer": answer, "chunks": chunks})
+            self.turn_count += 1
+
+    def overflow(self) -> List[Dict]:
+        """The oldest turns that no longer fit the verbatim window (still kept until summarized)"""
+        with self._lock:
+            keep = len(self.turns)
+            tokens = sum(self._turn_tokens(t) for t in self.turns)
+            while keep > 1 and (keep > self.max_recent_turns or tokens > self.history_max_tokens):
+                tokens -= self._turn_tokens(self.turns[len(self.turns) - keep])
+                keep -= 1
+            return self.turns[:len(self.turns) - keep]
+
+    def recent_chunks(self) -> List[Dict]:
+        """Chunks retrieved in the last reuse_turns turns, newest first"""
+        with self._lock:
+            recent = self.turns[-self.reuse_turns:] if self.reuse_turns else []
+            return [chunk for turn in reversed(recent) for chunk in turn["chunks"]]
+
+    @staticmethod
+    def _turn_tokens(turn: Dict) -> int:
+        return estimate_tokens(turn["question"]) + estimate_tokens(turn["answer"])
+
+    # ----------------------------------------------------------------------
+    # ROLLING SUMMARY
+    # ----------------------------------------------------------------------
+
+    def set_pending_summary(self, future) -> None:
+        self._pending = future
+
+    def wait_for_summary(self) -> None:
+        """Block until a background summary update (if any) has been applied"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        try:
+            pending.result()
+        except Exception as e:
+            # The turns were not dropped, so the next turn retries folding them
+            self.logger.warning(f"⚠️ Conversation summary update failed: {e}")
+
+    def update_summary(self, summary: str, folded: List[Dict]) -> None:
+        """Apply a new summary and drop the turns it now covers"""
+        with self._lock:
+            self.summary = truncate_to_tokens(summary.strip(), self.summary_max_tokens)
+            folded_ids = {id(turn) for turn in folded}
+            self.turns = [turn for turn in self.turns if id(turn) not in folded_ids]
+
+    def render_history(self, answer_chars: int = 600) -> str:
+        """Summary plus recent turns, formatted for a prompt (bounded by the token budgets)"""
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of earlier conversation: {self.summary}")
+            for turn in self.turns:
+                parts.append(f"User: {turn['question']}")
+                parts.append(f"Assistant: {truncate_to_tokens(turn['answer'], answer_chars // 4)}")
+            return "\n".join(parts)
+
+    def clear(self) -> None:
+        self.wait_for_summary()
+        with self._lock:
+            self.turns.clear()
+            self.summary = ""
+            self.turn_count = 0
@@ -3,12 +3,20 @@ Database operations for logging and storage
 """
 import sqlite3
 import json
+import hashlib
+import threading
+import zlib
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 from logger import get_logger
 
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
 
 class NumpyEncoder(json.JSONEncoder):
     """Custom JSON Encoder to handle NumPy data types"""
@@ -30,6 +38,17 @@ class Database:
         self.db_path = db_path or config.get('paths.database', 'data/docintel.db')
         self.logger = get_logger(__name__)
 
+        # Answer compression for chat_logs: "none", "zlib" or "zstd" (needs `zstandard`)
+        self.compression = str(config.get('database.compression', 'zlib')).lower()
+        self.compress_min_bytes = int(config.get('database.compress_min_bytes', 512))
+        if self.compression == 'zstd' and zstandard is None:
+            self.logger.warning("⚠️ zstandard is not installed, falling back to zlib compression")
+            self.compression = 'zlib'
+
+        # (index_version, document, page, chunk_id) -> chunks.id, to skip repeated lookups
+        self._chunk_ids: Dict[Tuple, int] = {}
+        self._chunk_ids_lock = threading.Lock()
+
         # Create data directory
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
@@ -81,6 +100,92 @@ class Database:
             )
         """)
 
+        # Versioned chunk table referenced by chat_logs; the text itself lives in
+        # chunk_texts, keyed by hash, so a rebuild does not store unchanged chunk text again
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                index_version TEXT NOT NULL,
+                document TEXT,
+                page INTEGER,
+                chunk_id INTEGER,
+                text_hash TEXT,
+                text TEXT,
+                aliases TEXT,
+                first_seen TEXT NOT NULL,
+                UNIQUE (index_version, document, page, chunk_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chunk_texts (
+                text_hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL
+            )
+        """)
+        # Rows written before chunk_texts existed kept their own copy of the text
+        cursor.execute("""
+            INSERT OR IGNORE INTO chunk_texts (text_hash, text)
+            SELECT text_hash, text FROM chunks WHERE text IS NOT NULL AND text_hash IS NOT NULL
+        """)
+        cursor.execute("""
+            UPDATE chunks SET text = NULL WHERE text IS NOT NULL AND text_hash IS NOT NULL
+        """)
+
+        # Hourly rollups of old system_metrics rows
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS system_metrics_hourly (
+                hour TEXT NOT NULL,
+                metric_name TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                sum REAL,
+                min REAL,
+                max REAL,
+                PRIMARY KEY (hour, metric_name)
+            )
+        """)
+
+        # Columns added after the first release
+        chat_columns = {row[1] for row in cursor.execute("PRAGMA table_info(chat_logs)")}
+        if "answer_codec" not in chat_columns:
+            cursor.execute("ALTER TABLE chat_logs ADD COLUMN answer_codec TEXT")
+
+        # Indexes for get_chat_logs() / get_metrics() / rollups
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_chat_logs_timestamp ON chat_logs (timestamp)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_system_metrics_name_ts ON system_metrics (metric_name, timestamp)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_system_metrics_timestamp ON system_metrics (timestamp)
+        """)
+
+        # Background ingestion job queue
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                filename TEXT,
+                path TEXT,
+                content_hash TEXT,
+                size_bytes INTEGER DEFAULT 0,
+                upload_seconds REAL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                progress REAL DEFAULT 0,
+                message TEXT,
+                chunks INTEGER DEFAULT 0,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ingest_jobs_hash ON ingest_jobs (content_hash)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs (status)
+        """)
+
         conn.commit()
         conn.close()
         self.logger.debug("Database tables created/verified")
@@ -90,22 +195,33 @@ class Database:
     # ---------------------------------------------------------
     def log_interaction(self, question: str, chunks: List[Dict],
                        answer: str, citations: List[Dict],
-                       execution_time: float = 0.0) -> int:
-        """Log a chat interaction"""
+                       execution_time: float = 0.0,
+                       index_version: str = "unversioned") -> int:
+        """
+        Log a chat interaction.
+        Chunks are stored once in the chunks table; the log row only keeps
+        [{"ref": chunks.id, "score": ...}] entries. Citations identical to the
+        retrieved chunks are stored as NULL.
+        """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        chunk_refs = self._chunk_refs(cursor, chunks, index_version)
+        citation_refs = None if citations is chunks else self._chunk_refs(cursor, citations, index_version)
+        stored_answer, codec = self._compress(answer)
+
         cursor.execute("""
             INSERT INTO chat_logs 
-            (timestamp, question, retrieved_chunks, answer, citations, execution_time)
-            VALUES (?, ?, ?, ?, ?, ?)
+            (timestamp, question, retrieved_chunks, answer, citations, execution_time, answer_codec)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (
             datetime.now().isoformat(),
             question,
-            json.dumps(chunks, cls=NumpyEncoder),   # ✅ FIX APPLIED
-            answer,
-            json.dumps(citations, cls=NumpyEncoder), # ✅ FIX APPLIED
-            execution_time
+            json.dumps(chunk_refs, cls=NumpyEncoder),
+            stored_answer,
+            json.dumps(citation_refs, cls=NumpyEncoder) if citation_refs is not None else None,
+            execution_time,
+            codec
         ))
 
         log_id = cursor.lastrowid
@@ -115,6 +231,85 @@ class Database:
         self.logger.debug(f"Logged interaction with ID: {log_id}")
         return log_id
 
+    def _chunk_refs(self, cursor, chunks: List[Dict], index_version: str) -> List[Dict]:
+        """Upsert chunks into the chunks table and return compact {"ref", "score"} entries"""
+        refs = []
+        for chunk in chunks or []:
+            key = (index_version, chunk.get("document"), chunk.get("page"), chunk.get("chunk_id"))
+            with self._chunk_ids_lock:
+                ref = self._chunk_ids.get(key)
+
+            if ref is None:
+                text = chunk.get("text")
+                text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest() if text else None
+                if text_hash:
+                    cursor.execute("""
+                        INSERT OR IGNORE INTO chunk_texts (text_hash, text) VALUES (?, ?)
+                    """, (text_hash, text))
+                cursor.execute("""
+                    INSERT OR IGNORE INTO chunks
+                    (index_version, document, page, chunk_id, text_hash, aliases, first_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    *key,
+                    text_hash,
+                    json.dumps(chunk["aliases"], cls=NumpyEncoder) if chunk.get("aliases") else None,
+                    datetime.now().isoformat()
+                ))
+                cursor.execute("""
+                    SELECT id FROM chunks
+                    WHERE index_version = ? AND document IS ? AND page IS ? AND chunk_id IS ?
+                """, key)
+                ref = cursor.fetchone()[0]
+                with self._chunk_ids_lock:
+                    self._chunk_ids[key] = ref
+
+            refs.append({"ref": ref, "score": round(float(chunk.get("score", 0.0)), 6)})
+        return refs
+
+    def _resolve_refs(self, cursor, stored: Optional[str]) -> List[Dict]:
+        """Expand stored chunk refs back into chunk dicts (legacy rows hold full dicts)"""
+        if not stored:
+            return []
+        entries = json.loads(stored)
+        ref_ids = [e["ref"] for e in entries if isinstance(e, dict) and "ref" in e]
+        if not ref_ids:
+            return entries
+
+        placeholders = ",".join("?" * len(ref_ids))
+        cursor.execute(f"""
+            SELECT c.id, c.document, c.page, c.chunk_id, COALESCE(t.text, c.text), c.aliases
+            FROM chunks c LEFT JOIN chunk_texts t ON t.text_hash = c.text_hash
+            WHERE c.id IN ({placeholders})
+        """, ref_ids)
+        rows = {
+            row[0]: {"document": row[1], "page": row[2], "chunk_id": row[3], "text": row[4],
+                     "aliases": json.loads(row[5]) if row[5] else []}
+            for row in cursor.fetchall()
+        }
+        return [{**rows.get(e["ref"], {}), "ref": e["ref"], "score": e.get("score")} for e in entries]
+
+    # ---------------------------------------------------------
+    # Answer Compression
+    # ---------------------------------------------------------
+    def _compress(self, answer: str) -> Tuple[object, Optional[str]]:
+        data = answer.encode("utf-8")
+        if self.compression == "none" or len(data) < self.compress_min_bytes:
+            return answer, None
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(data), "zstd"
+        return zlib.compress(data, 6), "zlib"
+
+    @staticmethod
+    def _decompress(stored, codec: Optional[str]) -> str:
+        if codec is None:
+            return stored
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("This chat log answer is zstd-compressed; install `zstandard` to read it")
+            return zstandard.ZstdDecompressor().decompress(stored).decode("utf-8")
+        return zlib.decompress(stored).decode("utf-8")
+
     # ---------------------------------------------------------
     # Log Test Queries
     # ---------------------------------------------------------
@@ -170,6 +365,196 @@ class Database:
 
         return metric_id
 
+    def log_metrics(self, metrics: List[Tuple[str, float, Dict]]) -> None:
+        """Log several (metric_name, metric_value, metadata) rows in one transaction"""
+        now = datetime.now().isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.executemany("""
+            INSERT INTO system_metrics (timestamp, metric_name, metric_value, metadata)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (now, name, value, json.dumps(metadata, cls=NumpyEncoder) if metadata else None)
+            for name, value, metadata in metrics
+        ])
+
+        conn.commit()
+        conn.close()
+
+    # ---------------------------------------------------------
+    # Ingestion Job Queue
+    # ---------------------------------------------------------
+    def enqueue_ingest_job(self, filename: str = None, path: str = None,
+                           content_hash: str = None, size_bytes: int = 0,
+                           upload_seconds: float = 0.0) -> int:
+        """Add an ingestion job to the queue"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        now = datetime.now().isoformat()
+        cursor.execute("""
+            INSERT INTO ingest_jobs
+            (created_at, updated_at, filename, path, content_hash, size_bytes, upload_seconds, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'queued')
+        """, (now, now, filename, path, content_hash, size_bytes, upload_seconds))
+
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        self.logger.debug(f"Enqueued ingest job with ID: {job_id}")
+        return job_id
+
+    def find_ingest_job_by_hash(self, content_hash: str) -> Tuple:
+        """Return the latest non-failed job for a file content hash, if any"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT id, filename, status, path
+            FROM ingest_jobs
+            WHERE content_hash = ? AND status != 'failed'
+            ORDER BY id DESC
+            LIMIT 1
+        """, (content_hash,))
+
+        result = cursor.fetchone()
+        conn.close()
+
+        return result
+
+    def claim_ingest_jobs(self) -> List[int]:
+        """Atomically mark every queued job as running and return their IDs"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT id FROM ingest_jobs WHERE status = 'queued' ORDER BY id")
+        job_ids = [row[0] for row in cursor.fetchall()]
+        if job_ids:
+            now = datetime.now().isoformat()
+            cursor.executemany("""
+                UPDATE ingest_jobs
+                SET status = 'running', started_at = ?, updated_at = ?
+                WHERE id = ?
+            """, [(now, now, job_id) for job_id in job_ids])
+        cursor.execute("COMMIT")
+        conn.close()
+
+        return job_ids
+
+    def update_ingest_jobs(self, job_ids: List[int], **fields) -> None:
+        """Update status/progress columns of one or more ingestion jobs"""
+        if not job_ids:
+            return
+        fields["updated_at"] = datetime.now().isoformat()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.executemany(
+            f"UPDATE ingest_jobs SET {columns} WHERE id = ?",
+            [(*fields.values(), job_id) for job_id in job_ids]
+        )
+
+        conn.commit()
+        conn.close()
+
+    def requeue_running_ingest_jobs(self) -> int:
+        """Put jobs left 'running' by a crashed worker back in the queue"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            UPDATE ingest_jobs SET status = 'queued', progress = 0, updated_at = ?
+            WHERE status = 'running'
+        """, (datetime.now().isoformat(),))
+
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+
+        return count
+
+    def get_ingest_jobs(self, limit: int = 10) -> List[Tuple]:
+        """Retrieve recent ingestion jobs"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT id, filename, status, progress, message, size_bytes, upload_seconds,
+                   chunks, started_at, finished_at
+            FROM ingest_jobs
+            ORDER BY id DESC
+            LIMIT ?
+        """, (limit,))
+
+        results = cursor.fetchall()
+        conn.close()
+
+        return results
+
+    # ---------------------------------------------------------
+    # Retention / Rollup
+    # ---------------------------------------------------------
+    def rollup_metrics(self, older_than_days: int = 7) -> int:
+        """
+        Aggregate system_metrics rows older than the cutoff into hourly
+        count/sum/min/max summaries, then delete the raw rows.
+        Returns the number of raw rows rolled up.
+        """
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT INTO system_metrics_hourly (hour, metric_name, count, sum, min, max)
+            SELECT substr(timestamp, 1, 13), metric_name,
+                   COUNT(*), SUM(metric_value), MIN(metric_value), MAX(metric_value)
+            FROM system_metrics
+            WHERE timestamp < ?
+            GROUP BY substr(timestamp, 1, 13), metric_name
+            ON CONFLICT (hour, metric_name) DO UPDATE SET
+                count = count + excluded.count,
+                sum = sum + excluded.sum,
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max)
+        """, (cutoff,))
+        cursor.execute("DELETE FROM system_metrics WHERE timestamp < ?", (cutoff,))
+
+        rolled_up = cursor.rowcount
+        conn.commit()
+        conn.close()
+
+        self.logger.info(f"📦 Rolled up {rolled_up} metric rows older than {older_than_days} day(s)")
+        return rolled_up
+
+    def vacuum(self) -> None:
+        """Reclaim space freed by deleted rows"""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("VACUUM")
+        conn.close()
+
+    def get_hourly_metrics(self, metric_name: str, limit: int = 168) -> List[Tuple]:
+        """Retrieve hourly rollups (hour, count, avg, min, max) for one metric"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT hour, count, sum / count, min, max
+            FROM system_metrics_hourly
+            WHERE metric_name = ?
+            ORDER BY hour DESC
+            LIMIT ?
+        """, (metric_name, limit))
+
+        results = cursor.fetchall()
+        conn.close()
+
+        return results
+
     # ---------------------------------------------------------
     # Retrieval Methods
     # ---------------------------------------------------------
@@ -179,15 +564,61 @@ class Database:
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT timestamp, question, answer, citations, execution_time
+            SELECT timestamp, question, answer, answer_codec, retrieved_chunks, citations, execution_time
             FROM chat_logs 
             ORDER BY timestamp DESC 
             LIMIT ?
         """, (limit,))
 
-        results = cursor.fetchall()
+        results = []
+        for timestamp, question, answer, codec, retrieved, citations, execution_time in cursor.fetchall():
+            resolved = self._resolve_refs(cursor, citations if citations is not None else retrieved)
+            results.append((
+                timestamp,
+                question,
+                self._decompress(answer, codec),
+                json.dumps(resolved, cls=NumpyEncoder),
+                execution_time
+            ))
+        conn.close()
+
+        return results
+
+    def get_replay_queries(self, source: str = "chat_logs", limit: int = 1000) -> List[Dict]:
+        """
+        Load logged questions for traffic replay, oldest first.
+        Each entry has the original timestamp, question, execution time (if logged)
+        and the (document, page, chunk_id) keys of the chunks retrieved back then.
+        """
+        if source == "chat_logs":
+            query = """
+                SELECT timestamp, question, COALESCE(retrieved_chunks, citations), execution_time
+                FROM chat_logs ORDER BY timestamp DESC LIMIT ?
+            """
+        elif source == "test_queries":
+            query = """
+                SELECT timestamp, query, citations, NULL
+                FROM test_queries ORDER BY timestamp DESC LIMIT ?
+            """
+        else:
+            raise ValueError(f"Unknown replay source: {source}")
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute(query, (limit,))
+        results = []
+        for timestamp, question, chunks, execution_time in cursor.fetchall():
+            resolved = self._resolve_refs(cursor, chunks)
+            results.append({
+                "timestamp": timestamp,
+                "question": question,
+                "execution_time": execution_time,
+                "chunks": [(c.get("document"), c.get("page"), c.get("chunk_id")) for c in resolved]
+            })
         conn.close()
 
+        results.reverse()
         return results
 
     def get_test_results(self) -> List[Tuple]:
@@ -0,0 +1,88 @@
+"""
+Near-duplicate detection for text chunks (MinHash + LSH banding)
+"""
+import zlib
+import numpy as np
+from typing import Dict, List, Optional
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHashDeduplicator:
+    """Finds near-duplicate texts by estimated Jaccard similarity of word shingles"""
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64,
+                 shingle_size: int = 5, bands: int = 16, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        # Canonical signatures and LSH buckets: band -> bucket key -> canonical ids
+        self._signatures: List[np.ndarray] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    # ----------------------------------------------------------------------
+    # SIGNATURES
+    # ----------------------------------------------------------------------
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        n = self.shingle_size
+        if len(words) <= n:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + n]) for i in range(len(words) - n + 1)]
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in set(grams)),
+                           dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text (num_perm 31-bit values)"""
+        hashes = self._shingles(text)
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity between two signatures"""
+        return float(np.mean(sig_a == sig_b))
+
+    # ----------------------------------------------------------------------
+    # INCREMENTAL DEDUPLICATION
+    # ----------------------------------------------------------------------
+
+    def find_or_add(self, text: str) -> Optional[int]:
+        """
+        Look up a text among the canonical texts seen so far.
+        Returns:
+            Optional[int]: Id of the matching canonical text, or None if the text
+            is new (it is then registered as canonical with the next id).
+        """
+        sig = self.signature(text)
+        band_keys = [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+
+        best_id, best_sim = None, self.threshold
+        for cand in candidates:
+            sim = self.similarity(sig, self._signatures[cand])
+            if sim >= best_sim:
+                best_id, best_sim = cand, sim
+        if best_id is not None:
+            return best_id
+
+        new_id = len(self._signatures)
+        self._signatures.append(sig)
+        for band, key in enumerate(band_keys):
+            self._buckets[band].setdefault(key, []).append(new_id)
+        return None
@@ -3,8 +3,9 @@ Document processing and text extraction module
 """
 import PyPDF2
 from pathlib import Path
-from typing import List, Tuple, Dict
+from typing import Callable, List, Tuple, Dict, Optional
 from logger import get_logger
+from src.dedup import MinHashDeduplicator
 
 
 class DocumentProcessor:
@@ -20,6 +21,13 @@ class DocumentProcessor:
         self.chunk_overlap = int(config.get("chunking.chunk_overlap", 50))
         self.logger = get_logger(__name__)
 
+        # Near-duplicate elimination (e.g. several revisions of the same PDF)
+        self.dedup_enabled = bool(config.get("dedup.enabled", True))
+        self.dedup_threshold = float(config.get("dedup.threshold", 0.9))
+        self.dedup_num_perm = int(config.get("dedup.num_perm", 64))
+        self.dedup_shingle_size = int(config.get("dedup.shingle_size", 5))
+        self.last_report: Dict = {}
+
         # Ensure the documents directory exists
         self.docs_dir.mkdir(parents=True, exist_ok=True)
         self.logger.info(f"DocumentProcessor initialized with directory: {self.docs_dir}")
@@ -86,9 +94,13 @@ class DocumentProcessor:
     # PROCESS ALL DOCUMENTS
     # ----------------------------------------------------------------------
 
-    def process_all_documents(self) -> Tuple[List[str], List[Dict]]:
+    def process_all_documents(self, progress_callback: Optional[Callable[[int, int], None]] = None
+                              ) -> Tuple[List[str], List[Dict]]:
         """
         Extract and chunk all PDF and TXT documents from the configured directory.
+        Args:
+            progress_callback: Optional callable invoked as (files_done, files_total)
+                after each document is processed.
         Returns:
             Tuple[List[str], List[Dict]]: A list of text chunks and corresponding metadata.
         """
@@ -99,8 +111,10 @@ class DocumentProcessor:
         all_chunks = []
         metadata = []
 
-        # Collect all supported files
+        # Collect all supported files, newest first (then by name) so that among near-duplicate
+        # revisions the latest one is always the canonical chunk and the others become aliases
         files = list(self.docs_dir.glob("*.pdf")) + list(self.docs_dir.glob("*.txt"))
+        files.sort(key=lambda path: (-path.stat().st_mtime_ns, path.name))
 
         if not files:
             self.logger.warning(f"⚠️ No documents found in {self.docs_dir}")
@@ -108,7 +122,18 @@ class DocumentProcessor:
 
         self.logger.info(f"📂 Found {len(files)} document(s) to process...")
 
-        for file_path in files:
+        dedup = None
+        if self.dedup_enabled:
+            dedup = MinHashDeduplicator(
+                threshold=self.dedup_threshold,
+                num_perm=self.dedup_num_perm,
+                shingle_size=self.dedup_shingle_size
+            )
+
+        total_chunks = 0
+        duplicate_documents = []
+
+        for file_num, file_path in enumerate(files, start=1):
             self.logger.info(f"📄 Processing: {file_path.name}")
 
             if file_path.suffix.lower() == ".pdf":
@@ -116,17 +141,55 @@ class DocumentProcessor:
             else:
                 pages = self.extract_from_txt(file_path)
 
+            file_chunks = file_duplicates = 0
             for page_data in pages:
                 chunks = self.chunk_text(page_data["text"])
 
                 for idx, chunk in enumerate(chunks):
-                    all_chunks.append(chunk)
-                    metadata.append({
+                    total_chunks += 1
+                    file_chunks += 1
+                    source = {
                         "document": file_path.name,
                         "page": page_data["page"],
-                        "chunk_id": idx,
-                        "text": chunk
-                    })
+                        "chunk_id": idx
+                    }
+
+                    # Keep one canonical chunk; near-duplicates become its aliases
+                    canonical = dedup.find_or_add(chunk) if dedup else None
+                    if canonical is not None:
+                        metadata[canonical]["aliases"].append(source)
+                        file_duplicates += 1
+                        continue
 
+                    all_chunks.append(chunk)
+                    metadata.append({**source, "text": chunk, "aliases": []})
+
+            if file_chunks and file_duplicates == file_chunks:
+                duplicate_documents.append(file_path.name)
+
+            if progress_callback:
+                progress_callback(file_num, len(files))
+
+        self.last_report = self._ingest_report(len(files), total_chunks, len(all_chunks), duplicate_documents)
         self.logger.info(f"✅ Created {len(all_chunks)} chunks from {len(files)} document(s)")
+        if dedup:
+            self.logger.info(
+                f"🧹 Deduplication: {total_chunks} → {len(all_chunks)} chunks "
+                f"({self.last_report['reduction_pct']:.1f}% smaller index, "
+                f"{len(duplicate_documents)} fully duplicate document(s))"
+            )
         return all_chunks, metadata
+
+    @staticmethod
+    def _ingest_report(documents: int, chunks_before: int, chunks_after: int,
+                       duplicate_documents: List[str]) -> Dict:
+        """Summary of the last ingest run, including how much deduplication shrank the index"""
+        removed = chunks_before - chunks_after
+        return {
+            "documents": documents,
+            "chunks_before": chunks_before,
+            "chunks_after": chunks_after,
+            "duplicates_removed": removed,
+            "reduction_pct": 100.0 * removed / chunks_before if chunks_before else 0.0,
+            "duplicate_documents": duplicate_documents
+        }
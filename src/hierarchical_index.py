@@ -0,0 +1,73 @@
+"""
+Coarse-to-fine retrieval helpers — document/page centroid index over chunk vectors
+"""
+import numpy as np
+import faiss
+from typing import Dict, List, Tuple
+
+LEVELS = ("document", "page")
+
+
+def group_key(meta: Dict, level: str = "document") -> Tuple:
+    """Return the grouping key of a chunk for the given level"""
+    if level == "page":
+        return (meta.get("document"), meta.get("page"))
+    return (meta.get("document"),)
+
+
+def build_centroid_index(embeddings: np.ndarray, metadata: List[Dict],
+                         level: str = "document") -> Tuple[faiss.Index, Dict]:
+    """
+    Build a small FAISS index holding one centroid vector per document (or page).
+    Returns:
+        Tuple[faiss.Index, Dict]: The centroid index and the group table
+        ({"level", "keys", "members"}) mapping each centroid row to its chunk ids.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Unknown centroid level '{level}' (expected one of {LEVELS})")
+
+    groups = {}
+    for chunk_idx, meta in enumerate(metadata):
+        groups.setdefault(group_key(meta, level), []).append(chunk_idx)
+
+    keys = list(groups.keys())
+    members = [np.asarray(groups[key], dtype="int64") for key in keys]
+    centroids = np.vstack([embeddings[ids].mean(axis=0) for ids in members]).astype("float32")
+
+    index = faiss.IndexFlatL2(centroids.shape[1])
+    index.add(centroids)
+    return index, {"level": level, "keys": keys, "members": members}
+
+
+def candidate_chunk_ids(centroid_index: faiss.Index, groups: Dict, query_emb: np.ndarray,
+                        fanout: int, min_chunks: int = 1) -> np.ndarray:
+    """
+    Pick the top-M groups for a single query and return the ids of their chunks.
+    M is doubled until the groups hold at least min_chunks chunks; returns None
+    once that would take every group (a flat search is then just as cheap).
+    """
+    fanout = max(1, int(fanout))
+    while fanout < centroid_index.ntotal:
+        _, group_ids = centroid_index.search(query_emb, fanout)
+        selected = [groups["members"][g] for g in group_ids[0] if g >= 0]
+        if sum(len(ids) for ids in selected) >= min_chunks:
+            return np.ascontiguousarray(np.concatenate(selected), dtype="int64")
+        fanout *= 2
+    return None
+
+
+def hierarchical_search(chunk_index: faiss.Index, centroid_index: faiss.Index, groups: Dict,
+                        query_emb: np.ndarray, top_k: int, fanout: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search the chunk index restricted to the chunks of the top-M groups, widening M
+    when those groups hold fewer than top_k chunks, so top_k results come back
+    whenever the index has them. Falls back to a flat search when every group is needed.
+    Returns the usual FAISS (distances, indices) pair.
+    """
+    ids = candidate_chunk_ids(centroid_index, groups, query_emb, fanout, min_chunks=top_k)
+    if ids is None:
+        return chunk_index.search(query_emb, top_k)
+
+    selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+    params = faiss.SearchParameters(sel=selector)
+    return chunk_index.search(query_emb, top_k, params=params)
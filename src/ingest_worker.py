@@ -0,0 +1,204 @@
+"""
+Background ingestion worker — streams uploads to disk and rebuilds the index off the UI thread
+"""
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+from src.database import Database
+from src.document_processor import DocumentProcessor
+from logger import get_logger
+
+
+class IngestionWorker:
+    """Consumes the ingest_jobs queue in a daemon thread and swaps in the rebuilt index"""
+
+    def __init__(self, db: Database = None):
+        from logger.config_manager import ConfigManager
+        config = ConfigManager()
+
+        self.db = db or Database()
+        self.docs_dir = Path(config.get("paths.documents", "data/documents"))
+        self.poll_interval = float(config.get("ingest.poll_interval", 2.0))
+        self.upload_chunk_size = int(config.get("ingest.upload_chunk_size", 1024 * 1024))
+        self.logger = get_logger(__name__)
+
+        # Bumped after every successful rebuild; sessions reload their index when it changes
+        self.index_version = 0
+
+        self._store = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.docs_dir.mkdir(parents=True, exist_ok=True)
+
+    # ----------------------------------------------------------------------
+    # LIFECYCLE
+    # ----------------------------------------------------------------------
+
+    def start(self) -> "IngestionWorker":
+        """Start the worker thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return self
+
+        requeued = self.db.requeue_running_ingest_jobs()
+        if requeued:
+            self.logger.warning(f"⚠️ Re-queued {requeued} ingest job(s) interrupted by a restart")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+        self._thread.start()
+        self.logger.info("✅ Ingestion worker started")
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    # ----------------------------------------------------------------------
+    # PRODUCERS
+    # ----------------------------------------------------------------------
+
+    def submit_upload(self, uploaded_file) -> Tuple[int, bool]:
+        """
+        Stream an uploaded file to the documents directory and enqueue it.
+        Returns:
+            Tuple[int, bool]: The job ID and whether the content was already ingested
+            (in which case the existing job ID is returned and nothing is queued).
+        """
+        tmp_path, content_hash, size, seconds = self._stream_to_disk(uploaded_file)
+
+        existing = self.db.find_ingest_job_by_hash(content_hash)
+        # A later upload with the same name may have overwritten that file since
+        if existing and self._file_matches(existing[3], content_hash, size):
+            tmp_path.unlink()
+            self.logger.info(f"♻️ Skipping {uploaded_file.name}: same content as job #{existing[0]}")
+            return existing[0], True
+
+        final_path = self.docs_dir / Path(uploaded_file.name).name
+        tmp_path.replace(final_path)
+
+        job_id = self.db.enqueue_ingest_job(
+            filename=final_path.name,
+            path=str(final_path),
+            content_hash=content_hash,
+            size_bytes=size,
+            upload_seconds=seconds
+        )
+        self._wakeup.set()
+        return job_id, False
+
+    def request_rebuild(self) -> int:
+        """Enqueue a full re-index of the documents directory"""
+        job_id = self.db.enqueue_ingest_job(filename="(full rebuild)")
+        self._wakeup.set()
+        return job_id
+
+    def _file_matches(self, path: str, content_hash: str, size: int) -> bool:
+        """True if the file at path still holds the content with this hash"""
+        if not path:
+            return False
+        path = Path(path)
+        if not path.is_file() or path.stat().st_size != size:
+            return False
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.upload_chunk_size), b""):
+                digest.update(block)
+        return digest.hexdigest() == content_hash
+
+    def _stream_to_disk(self, uploaded_file) -> Tuple[Path, str, int, float]:
+        """Copy an upload in fixed-size chunks while hashing it, never holding it all in memory"""
+        start = time.perf_counter()
+        # ".part" suffix keeps half-written files out of the *.pdf / *.txt globs
+        tmp_path = self.docs_dir / f".{uuid.uuid4().hex}.part"
+        digest = hashlib.sha256()
+        size = 0
+
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        with open(tmp_path, "wb") as f:
+            while True:
+                block = uploaded_file.read(self.upload_chunk_size)
+                if not block:
+                    break
+                digest.update(block)
+                f.write(block)
+                size += len(block)
+
+        return tmp_path, digest.hexdigest(), size, time.perf_counter() - start
+
+    # ----------------------------------------------------------------------
+    # CONSUMER
+    # ----------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            job_ids = self.db.claim_ingest_jobs()
+            if not job_ids:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(job_ids)
+
+    def _process(self, job_ids: List[int]) -> None:
+        """Rebuild the index once for every job claimed in this batch"""
+        self.logger.info(f"⚙️ Ingesting job(s) {job_ids}")
+        start = time.perf_counter()
+
+        def on_progress(done: int, total: int) -> None:
+            self.db.update_ingest_jobs(
+                job_ids,
+                progress=0.5 * done / total,
+                message=f"Extracting text ({done}/{total} files)"
+            )
+
+        try:
+            processor = DocumentProcessor(str(self.docs_dir))
+            chunks, metadata = processor.process_all_documents(progress_callback=on_progress)
+            if not chunks:
+                raise ValueError("No text extracted from the uploaded documents")
+
+            self.db.update_ingest_jobs(job_ids, progress=0.5, message=f"Embedding {len(chunks)} chunks")
+            # build_index() writes a new build directory and then renames one CURRENT pointer,
+            # so sessions loading the index meanwhile still get a consistent (older) build
+            self._vector_store().build_index(chunks, metadata)
+
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            message = f"{len(chunks)} chunks in {elapsed:.1f}s ({len(chunks) / elapsed:.1f} chunks/s)"
+            removed = processor.last_report.get("duplicates_removed", 0)
+            if removed:
+                message += f", {removed} near-duplicates removed"
+
+            self.db.update_ingest_jobs(
+                job_ids,
+                status="done",
+                progress=1.0,
+                chunks=len(chunks),
+                message=message,
+                finished_at=datetime.now().isoformat()
+            )
+            self.index_version += 1
+            self.logger.info(f"✅ Ingest job(s) {job_ids} finished in {elapsed:.1f}s")
+
+        except Exception as e:
+            self.logger.error(f"❌ Ingest job(s) {job_ids} failed: {e}")
+            self.db.update_ingest_jobs(
+                job_ids,
+                status="failed",
+                message=str(e),
+                finished_at=datetime.now().isoformat()
+            )
+
+    def _vector_store(self):
+        # Loaded on first use, then reused so the embedding model is only loaded once
+        if self._store is None:
+            from src.vector_store import VectorStore
+            self._store = VectorStore()
+        return self._store
@@ -1,9 +1,56 @@
 # src/llm_engine.py
 
 import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 from dotenv import load_dotenv
+import numpy as np
+import groq
 from groq import Groq
 from logger import get_logger
+from logger.config_manager import ConfigManager
+
+
+class LLMError(Exception):
+    """Raised when the LLM could not produce an answer (after retries)"""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after N consecutive failures; lets one trial call through after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                return True  # the single trial call
+            return self.state == "closed"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
 
 
 class LLMEngine:
@@ -11,22 +58,50 @@ class LLMEngine:
 
     def __init__(self):
         load_dotenv()
+        config = ConfigManager()
         self.logger = get_logger(__name__)
         self.api_key = os.getenv("GROQ_API_KEY")
         self.model = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+        self.base_url = os.getenv("GROQ_BASE_URL") or config.get("llm.base_url")
+
+        # Resilience settings (see the `llm` section of config.yaml)
+        self.request_timeout = float(config.get("llm.request_timeout", 30))
+        self.max_retries = int(config.get("llm.max_retries", 3))
+        self.backoff_base = float(config.get("llm.backoff_base", 0.5))
+        self.backoff_max = float(config.get("llm.backoff_max", 8.0))
+        self.hedge_enabled = bool(config.get("llm.hedge.enabled", False))
+        self.hedge_quantile = float(config.get("llm.hedge.quantile", 0.95))
+        self.hedge_min_samples = int(config.get("llm.hedge.min_samples", 20))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(config.get("llm.circuit_breaker.failure_threshold", 5)),
+            reset_timeout=float(config.get("llm.circuit_breaker.reset_timeout", 30))
+        )
+
+        self.stats = {"calls": 0, "coalesced": 0, "retries": 0, "hedges": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()  # updated from caller and hedge-pool threads
+        self._latencies = deque(maxlen=200)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
 
         if not self.api_key:
             raise ValueError("❌ GROQ_API_KEY not found in .env file!")
 
         # Initialize Groq client
         try:
-            self.client = Groq(api_key=self.api_key)
+            self.reconnect()
             self._verify_model()
             self.logger.info(f"✅ LLM Engine initialized successfully with model: {self.model}")
         except Exception as e:
             self.logger.error(f"❌ Failed to initialize Groq LLM: {e}")
             raise
 
+    def reconnect(self):
+        """Create a fresh Groq client (e.g. in a forked worker, so processes don't share sockets)"""
+        # Retries are handled by generate(), not by the SDK
+        self.client = Groq(api_key=self.api_key, base_url=self.base_url,
+                           timeout=self.request_timeout, max_retries=0)
+
     def _verify_model(self):
         """Ping the model with a small prompt to verify connectivity"""
         try:
@@ -44,24 +119,138 @@ class LLMEngine:
             self.logger.error(f"❌ Model verification failed: {e}")
             raise
 
-    def generate(self, prompt):
-        """Generate response from the LLM model"""
-        try:
-            self.logger.info(f"🧠 Generating response using model: {self.model}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=512,
-            )
+    # ----------------------------------------------------------------------
+    # GENERATION
+    # ----------------------------------------------------------------------
+
+    def generate(self, prompt, max_tokens=512):
+        """
+        Generate response from the LLM model.
+        Identical prompts already in flight share one completion; transient
+        failures are retried. Raises LLMError when no answer can be produced.
+        """
+        key = (prompt, max_tokens)
+        with self._inflight_lock:
+            shared = self._inflight.get(key)
+            if shared is None:
+                shared = self._inflight[key] = Future()
+                leader = True
+            else:
+                leader = False
+                self._count("coalesced")
 
-            # ✅ FIX: Access message content properly
-            answer = response.choices[0].message.content.strip()
+        if not leader:
+            self.logger.debug("🔗 Joined an identical in-flight request")
+            return shared.result()
 
-            self.logger.info("✅ Response generated successfully.")
+        try:
+            answer = self._generate_with_retries(prompt, max_tokens)
+            shared.set_result(answer)
             return answer
-
         except Exception as e:
-            self.logger.error(f"❌ Error generating response: {e}")
-            return f"[Error] {e}"
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _generate_with_retries(self, prompt, max_tokens):
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise CircuitOpenError("LLM circuit breaker is open; the API is failing, try again shortly")
+
+            try:
+                answer = self._hedged_call(prompt, max_tokens)
+                self.breaker.record_success()
+                return answer
+            except Exception as e:
+                retryable = self._is_retryable(e)
+                # Always settle the call, or a failed half-open trial would leave the breaker stuck
+                if not retryable and isinstance(e, groq.APIStatusError):
+                    self.breaker.record_success()  # the API answered; a bad request says nothing about its health
+                else:
+                    self.breaker.record_failure()
+                if not retryable or attempt == self.max_retries:
+                    self.logger.error(f"❌ Error generating response: {e}")
+                    raise LLMError(f"LLM request failed: {e}") from e
+
+                delay = self._backoff_delay(attempt, e)
+                self._count("retries")
+                self.logger.warning(f"⚠️ LLM call failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def _hedged_call(self, prompt, max_tokens):
+        """Send a second, identical request if the first one is slower than the recent p95"""
+        hedge_after = self._hedge_delay()
+        if hedge_after is None:
+            return self._call(prompt, max_tokens)
+
+        primary = self._hedge_pool.submit(self._call, prompt, max_tokens)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        self.logger.debug("🏁 Hedging slow LLM request after %.2fs", hedge_after)
+        pending = {primary, self._hedge_pool.submit(self._call, prompt, max_tokens)}
+        error = None
+        # First successful response wins; the loser finishes in the background
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _call(self, prompt, max_tokens):
+        """A single chat completion request"""
+        self._count("calls")
+        self.logger.debug("🧠 Generating response using model: %s", self.model)
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=max_tokens,
+        )
+        self._latencies.append(time.perf_counter() - start)
+
+        # ✅ FIX: Access message content properly
+        answer = response.choices[0].message.content.strip()
+
+        self.logger.debug("✅ Response generated successfully.")
+        return answer
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    # ----------------------------------------------------------------------
+    # POLICIES
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def _is_retryable(error):
+        """Rate limits, 5xx responses, timeouts and connection errors are worth retrying"""
+        if isinstance(error, (groq.RateLimitError, groq.APIConnectionError)):
+            return True
+        if isinstance(error, groq.APIStatusError):
+            return error.status_code >= 500
+        return False
+
+    def _backoff_delay(self, attempt, error):
+        """Full-jitter exponential backoff, honouring Retry-After when the API sends it"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(delay, min(float(retry_after), self.backoff_max))
+        except (TypeError, ValueError):
+            return delay
 
+    def _hedge_delay(self):
+        if not self.hedge_enabled or len(self._latencies) < self.hedge_min_samples:
+            return None
+        return float(np.quantile(list(self._latencies), self.hedge_quantile))
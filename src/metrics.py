@@ -0,0 +1,157 @@
+"""
+In-process latency tracing for the RAG pipeline — per-stage spans, percentiles and Prometheus export
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import numpy as np
+from logger import get_logger
+
+# Pipeline stages in the order they run; "total" is a whole query, "summarize" runs in the background
+STAGES = ("rewrite", "embed", "search", "context", "llm", "db_write", "total", "summarize")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageHistogram:
+    """Latency samples for one stage: all-time count/sum plus a sliding window for percentiles"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.percentile(np.fromiter(self.samples, dtype=float), [q * 100 for q in QUANTILES])
+        return dict(zip(QUANTILES, values.tolist()))
+
+
+class MetricsRegistry:
+    """Thread-safe registry of stage latencies, shared by every QueryEngine in the process"""
+
+    def __init__(self, window: int = 2048, flush_interval: float = 60.0):
+        self.window = window
+        self.flush_interval = flush_interval
+        self._histograms: Dict[str, StageHistogram] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    # ----------------------------------------------------------------------
+    # RECORDING
+    # ----------------------------------------------------------------------
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = StageHistogram(self.window)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block and record it under the given stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # ----------------------------------------------------------------------
+    # READING
+    # ----------------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, mean and p50/p95/p99 in seconds"""
+        with self._lock:
+            snapshot = {
+                stage: (h.count, h.total, h.quantiles())
+                for stage, h in self._histograms.items()
+            }
+
+        ordered = sorted(snapshot, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES))
+        return {
+            stage: {
+                "count": snapshot[stage][0],
+                "mean": snapshot[stage][1] / snapshot[stage][0] if snapshot[stage][0] else 0.0,
+                **{f"p{int(q * 100)}": v for q, v in snapshot[stage][2].items()}
+            }
+            for stage in ordered
+        }
+
+    def to_prometheus(self) -> str:
+        """Render the stage latencies in the Prometheus text exposition format (summary type)"""
+        name = "docintel_stage_latency_seconds"
+        pid = os.getpid()
+        lines = [
+            f"# HELP {name} Latency of each RAG pipeline stage (sliding window quantiles).",
+            f"# TYPE {name} summary",
+        ]
+        with self._lock:
+            histograms = [(stage, h.count, h.total, h.quantiles()) for stage, h in self._histograms.items()]
+
+        for stage, count, total, quantiles in histograms:
+            labels = f'stage="{stage}",pid="{pid}"'
+            for q, value in quantiles.items():
+                lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"{name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+    # ----------------------------------------------------------------------
+    # PERSISTENCE
+    # ----------------------------------------------------------------------
+
+    def maybe_flush(self, db) -> bool:
+        """Flush to the database in the background if flush_interval has elapsed since the last flush"""
+        with self._lock:
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                return False
+            self._last_flush = time.monotonic()
+        # The SQLite commit would otherwise land on the request that crossed the interval
+        threading.Thread(target=self._flush_quietly, args=(db,), name="metrics-flush", daemon=True).start()
+        return True
+
+    def _flush_quietly(self, db) -> None:
+        try:
+            self.flush(db)
+        except Exception as e:
+            get_logger(__name__).warning(f"⚠️ Failed to flush latency metrics: {e}")
+
+    def flush(self, db) -> None:
+        """Write the current per-stage percentiles (in ms) to system_metrics in one transaction"""
+        pid = os.getpid()
+        rows = [
+            (f"latency.{stage}.{key}", stats[key] * 1000,
+             {"count": stats["count"], "window": self.window, "pid": pid})
+            for stage, stats in self.summary().items()
+            for key in ("p50", "p95", "p99")
+        ]
+        if rows:
+            db.log_metrics(rows)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """Process-wide metrics registry (configured from the 'metrics' section of config.yaml)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from logger.config_manager import ConfigManager
+            config = ConfigManager()
+            _registry = MetricsRegistry(
+                window=int(config.get("metrics.window", 2048)),
+                flush_interval=float(config.get("metrics.flush_interval", 60))
+            )
+    return _registry
@@ -0,0 +1,237 @@
+"""
+Production traffic replay — re-runs logged questions against QueryEngine
+
+Run with:
+    python -m src.replay --source chat_logs --limit 500 --rate 10 --concurrency 8
+    python -m src.replay --source test_queries --rate 0 --llm groq
+
+Questions are replayed open-loop on their original inter-arrival times divided by
+--rate (0 = as fast as possible). Nothing is written to chat_logs or system_metrics.
+"""
+import argparse
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from src.database import Database
+from logger import get_logger
+
+
+class StubLLM:
+    """Stand-in for LLMEngine: sleeps for a sampled latency instead of calling Groq"""
+
+    def __init__(self, median: float = 0.8, sigma: float = 0.5,
+                 samples: Optional[List[float]] = None, seed: int = None):
+        self.median = median
+        self.sigma = sigma
+        self.samples = samples
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_metrics(cls, db: Database, limit: int = 50, **kwargs) -> Optional["StubLLM"]:
+        """
+        Log-normal fitted to the LLM stage percentiles flushed to system_metrics
+        (median of the recent p50s, sigma from p95/p50). None if none were flushed.
+        """
+        p50 = [row[2] for row in db.get_metrics("latency.llm.p50", limit) if row[2] > 0]
+        p95 = [row[2] for row in db.get_metrics("latency.llm.p95", limit) if row[2] > 0]
+        if not p50 or not p95:
+            return None
+        median, tail = float(np.median(p50)) / 1000, float(np.median(p95)) / 1000
+        # p95 of a log-normal is median * exp(1.645 * sigma)
+        kwargs.update(median=median, sigma=max(math.log(max(tail, median) / median) / 1.645, 0.05))
+        return cls(**kwargs)
+
+    @classmethod
+    def from_logs(cls, entries: List[Dict], overhead: float = 0.0, **kwargs) -> "StubLLM":
+        """
+        Empirical latency distribution from logged execution times (falls back to log-normal).
+        execution_time covers the whole query, so the non-LLM overhead (seconds) is subtracted.
+        """
+        samples = [max(e["execution_time"] - overhead, 0.0) for e in entries if e.get("execution_time")]
+        return cls(samples=samples or None, **kwargs)
+
+    def sample_latency(self) -> float:
+        with self._lock:
+            if self.samples:
+                return self._rng.choice(self.samples)
+            return self._rng.lognormvariate(math.log(self.median), self.sigma)
+
+    def generate(self, prompt: str, max_tokens: int = 512) -> str:
+        time.sleep(self.sample_latency())
+        return f"[stub answer for a {len(prompt)}-character prompt]"
+
+
+class TrafficReplayer:
+    """Replays logged questions against a QueryEngine and measures what changed"""
+
+    def __init__(self, engine, concurrency: int = 8, rate: float = 1.0,
+                 max_gap: float = 5.0, top_k: int = 3):
+        self.engine = engine
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_gap = max_gap
+        self.top_k = top_k
+        self.logger = get_logger(__name__)
+
+    def schedule(self, entries: List[Dict]) -> List[float]:
+        """Send offsets (seconds from start): original gaps, capped at max_gap, divided by rate"""
+        if self.rate <= 0:
+            return [0.0] * len(entries)
+
+        offsets, offset, previous = [], 0.0, None
+        for entry in entries:
+            ts = datetime.fromisoformat(entry["timestamp"])
+            if previous is not None:
+                offset += min(max((ts - previous).total_seconds(), 0.0), self.max_gap) / self.rate
+            offsets.append(offset)
+            previous = ts
+        return offsets
+
+    def _run_one(self, entry: Dict, scheduled_at: float) -> Dict:
+        started = time.perf_counter()
+        try:
+            result = self.engine.run_query(entry["question"], self.top_k, log=False)
+            error = None
+        except Exception as e:
+            result, error = None, str(e)
+        finished = time.perf_counter()
+
+        overlap = None
+        if result and entry["chunks"]:
+            original = set(entry["chunks"])
+            replayed = {(c.get("document"), c.get("page"), c.get("chunk_id")) for c in result["citations"]}
+            overlap = len(original & replayed) / len(original)
+
+        return {
+            # Measured from the scheduled send time, so queueing delay is not hidden
+            "response_time": finished - scheduled_at,
+            "service_time": finished - started,
+            "overlap": overlap,
+            "error": error
+        }
+
+    def run(self, entries: List[Dict]) -> Dict:
+        offsets = self.schedule(entries)
+        seen, cache_hits = set(), 0
+        futures = []
+
+        self.logger.info(f"▶️ Replaying {len(entries)} queries (rate x{self.rate}, concurrency {self.concurrency})")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for entry, offset in zip(entries, offsets):
+                delay = start + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+                # An exact-match answer cache would have served repeats of earlier questions
+                key = " ".join(entry["question"].lower().split())
+                cache_hits += key in seen
+                seen.add(key)
+
+                futures.append(pool.submit(self._run_one, entry, start + offset))
+            results = [f.result() for f in futures]
+        wall = time.perf_counter() - start
+
+        ok = [r for r in results if r["error"] is None]
+        response = np.array([r["response_time"] for r in ok]) * 1000
+        service = np.array([r["service_time"] for r in ok]) * 1000
+        overlaps = [r["overlap"] for r in ok if r["overlap"] is not None]
+
+        def percentiles(values):
+            if not len(values):
+                return {}
+            return {f"p{q}": float(np.percentile(values, q)) for q in (50, 95, 99)}
+
+        return {
+            "queries": len(results),
+            "errors": len(results) - len(ok),
+            "wall_seconds": wall,
+            "throughput": len(ok) / wall if wall else 0.0,
+            "response_ms": percentiles(response),
+            "service_ms": percentiles(service),
+            "cache_hit_rate": cache_hits / len(results) if results else 0.0,
+            "retrieval_overlap": float(np.mean(overlaps)) if overlaps else None,
+            "overlap_samples": len(overlaps)
+        }
+
+
+def non_llm_overhead(db: Database, engine, entries: List[Dict], probes: int = 20) -> float:
+    """
+    Typical embed + search + context time in seconds: from the flushed stage metrics,
+    or else measured by running retrieval for a few of the questions being replayed.
+    """
+    stages = [db.get_metrics(f"latency.{stage}.p50", 50) for stage in ("embed", "search", "context")]
+    if all(stages):
+        return sum(float(np.median([row[2] for row in rows])) for rows in stages) / 1000
+
+    timings = []
+    for entry in entries[:probes]:
+        start = time.perf_counter()
+        engine.retrieve_relevant_chunks(entry["question"])
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) if timings else 0.0
+
+
+def print_report(report: Dict) -> None:
+    print(f"\n📊 Replayed {report['queries']} queries in {report['wall_seconds']:.1f}s "
+          f"— {report['throughput']:.2f} answers/s, {report['errors']} error(s)")
+    for name, key in (("Response time", "response_ms"), ("Service time", "service_ms")):
+        if report[key]:
+            print(f"   {name:<14} " + "  ".join(f"{q}={v:.1f}ms" for q, v in report[key].items()))
+    print(f"   Answer-cache hit rate (exact repeats): {report['cache_hit_rate']:.1%}")
+    if report["retrieval_overlap"] is not None:
+        print(f"   Retrieval overlap with logged chunks: {report['retrieval_overlap']:.1%} "
+              f"over {report['overlap_samples']} queries")
+    else:
+        print("   Retrieval overlap: no logged chunks to compare against")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged questions against QueryEngine")
+    parser.add_argument("--source", choices=["chat_logs", "test_queries"], default="chat_logs")
+    parser.add_argument("--limit", type=int, default=500, help="Most recent N questions")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Speed-up over the original arrival times (0 = as fast as possible)")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="Cap on a single original gap (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--llm", choices=["stub", "groq"], default="stub")
+    parser.add_argument("--stub-latency", choices=["metrics", "logs", "lognormal"], default="metrics",
+                        help="metrics: fit the LLM-stage percentiles flushed to system_metrics "
+                             "(falls back to logs); logs: logged execution times minus the measured "
+                             "embed/search/context time; lognormal: --stub-median/--stub-sigma")
+    parser.add_argument("--stub-median", type=float, default=0.8, help="Log-normal median (s)")
+    parser.add_argument("--stub-sigma", type=float, default=0.5, help="Log-normal sigma")
+    args = parser.parse_args()
+
+    db = Database()
+    entries = db.get_replay_queries(args.source, args.limit)
+    if not entries:
+        print(f"❌ No questions found in {args.source}.")
+        return
+
+    stub_options = {"median": args.stub_median, "sigma": args.stub_sigma}
+    from src.chatbot import QueryEngine
+    engine = QueryEngine(llm=StubLLM(**stub_options) if args.llm == "stub" else None)
+
+    if args.llm == "stub" and args.stub_latency != "lognormal":
+        stub = StubLLM.from_metrics(db) if args.stub_latency == "metrics" else None
+        if stub is None:
+            # Logged execution times include retrieval, which the replay measures again
+            overhead = non_llm_overhead(db, engine, entries)
+            stub = StubLLM.from_logs(entries, overhead=overhead, **stub_options)
+        engine.llm = stub
+
+    replayer = TrafficReplayer(engine, concurrency=args.concurrency, rate=args.rate,
+                               max_gap=args.max_gap, top_k=args.top_k)
+    print_report(replayer.run(entries))
+
+
+if __name__ == "__main__":
+    main()
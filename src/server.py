@@ -0,0 +1,393 @@
+"""
+Headless JSON HTTP service around QueryEngine (pre-forked, multi-worker)
+
+Run with:  python -m src.server [--host 0.0.0.0] [--port 8000] [--workers 4]
+
+Endpoints:
+    POST /query     {"question": str, "top_k": int}       -> answer + citations
+    POST /retrieve  {"query": str, "top_k": int}          -> chunks
+    POST /batch     {"queries": [str], "mode": "query" | "retrieve", "top_k": int}
+    GET  /health
+    GET  /metrics   Prometheus text format for the process that answers it
+
+With several workers every process serves the main port, so a scrape of /metrics there
+lands on a random worker. Each forked worker therefore also serves its own /metrics on
+server.metrics_port + <worker slot>; scrape those ports, one target per worker.
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.chatbot import QueryEngine
+from src.database import NumpyEncoder
+from src.llm_engine import LLMError
+from src.metrics import get_registry
+from logger import get_logger, stop_logging
+from logger.config_manager import ConfigManager
+
+
+class QueryServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a bounded number of in-flight engine calls"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, engine: QueryEngine, max_inflight: int = 4,
+                 request_timeout: float = 60.0, keepalive_timeout: float = 15.0,
+                 max_batch: int = 32, max_body_bytes: int = 1024 * 1024, backlog: int = 128):
+        self.engine = engine
+        # listen() backlog shared by every forked worker (socketserver's default is 5)
+        self.request_queue_size = backlog
+        self.request_timeout = request_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.max_batch = max_batch
+        self.max_body_bytes = max_body_bytes
+        self.logger = get_logger(__name__)
+
+        # Backpressure: at most max_inflight engine calls per worker process, others get 429
+        self.slots = threading.BoundedSemaphore(max_inflight)
+        self.executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="query")
+
+        # Requests being handled right now, so shutdown can let them finish
+        self.draining = False
+        self._active = 0
+        self._idle = threading.Condition()
+        super().__init__(address, QueryRequestHandler)
+
+    @contextmanager
+    def track(self):
+        with self._idle:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._active -= 1
+                self._idle.notify_all()
+
+    def drain(self, timeout: float) -> bool:
+        """Wait for in-flight requests after serve_forever() has returned; False on timeout"""
+        self.draining = True
+        with self._idle:
+            return self._idle.wait_for(lambda: self._active == 0, timeout)
+
+    def submit(self, fn, *args):
+        """Run fn in the worker pool; returns None when the server is saturated"""
+        if not self.slots.acquire(blocking=False):
+            return None
+        future = self.executor.submit(fn, *args)
+        # The slot is held until the work really finishes, even if the client timed out
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics only, on a worker's own metrics port"""
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        data = get_registry().to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """JSON request handler with HTTP/1.1 keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY, keep-alive
+    # clients stall ~40ms per request on delayed ACKs
+    disable_nagle_algorithm = True
+    server: QueryServer
+
+    def setup(self):
+        # Idle keep-alive connections are closed after keepalive_timeout seconds
+        self.timeout = self.server.keepalive_timeout
+        super().setup()
+
+    # ----------------------------------------------------------------------
+    # ROUTING
+    # ----------------------------------------------------------------------
+
+    def do_GET(self):
+        with self.server.track():
+            self._get()
+
+    def do_POST(self):
+        with self.server.track():
+            self._post()
+
+    def _get(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "pid": os.getpid(), "chunks": self.server.engine.index.ntotal})
+        elif self.path == "/metrics":
+            self._send_text(200, self.server.engine.metrics.to_prometheus(),
+                            "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def _post(self):
+        routes = {
+            "/query": self._query,
+            "/retrieve": self._retrieve,
+            "/batch": self._batch,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self.close_connection = True  # body left unread
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        if payload is None:  # error response already sent
+            return
+
+        try:
+            work = handler(payload)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        future = self.server.submit(work)
+        if future is None:
+            self._send_json(429, {"error": "Server busy, retry later"}, {"Retry-After": "1"})
+            return
+
+        try:
+            result = future.result(timeout=self.server.request_timeout)
+        except FutureTimeout:
+            self._send_json(504, {"error": f"Request timed out after {self.server.request_timeout:.0f}s"})
+            return
+        except LLMError as e:
+            self._send_json(503, {"error": str(e)}, {"Retry-After": "5"})
+            return
+        except Exception as e:
+            self.server.logger.error(f"❌ Error handling {self.path}: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, result)
+
+    # ----------------------------------------------------------------------
+    # ENDPOINTS — validate the payload and return the work to run in the pool
+    # ----------------------------------------------------------------------
+
+    def _query(self, payload):
+        question = self._require_text(payload, "question")
+        top_k = self._top_k(payload)
+        return lambda: self.server.engine.run_query(question, top_k)
+
+    def _retrieve(self, payload):
+        query = self._require_text(payload, "query")
+        top_k = self._top_k(payload)
+        return lambda: {"query": query, "chunks": self.server.engine.retrieve_relevant_chunks(query, top_k)}
+
+    def _batch(self, payload):
+        queries = payload.get("queries")
+        if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+            raise ValueError("'queries' must be a non-empty list of strings")
+        if len(queries) > self.server.max_batch:
+            raise ValueError(f"Batch too large ({len(queries)} > {self.server.max_batch})")
+
+        mode = payload.get("mode", "query")
+        top_k = self._top_k(payload)
+        engine = self.server.engine
+
+        if mode == "retrieve":
+            return lambda: {"results": [
+                {"query": q, "chunks": chunks}
+                for q, chunks in zip(queries, engine.retrieve_relevant_chunks_batch(queries, top_k))
+            ]}
+        if mode == "query":
+            return lambda: {"results": [engine.run_query(q, top_k) for q in queries]}
+        raise ValueError("'mode' must be 'query' or 'retrieve'")
+
+    # ----------------------------------------------------------------------
+    # HELPERS
+    # ----------------------------------------------------------------------
+
+    @staticmethod
+    def _require_text(payload, key):
+        value = payload.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"'{key}' must be a non-empty string")
+        return value
+
+    @staticmethod
+    def _top_k(payload):
+        top_k = payload.get("top_k", 3)
+        # bool is a subclass of int, so {"top_k": true} would otherwise pass as 1
+        if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= 50:
+            raise ValueError("'top_k' must be an integer between 1 and 50")
+        return top_k
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # rfile.read(-1) would block until the client closes the connection
+            self.close_connection = True
+            raise ValueError("Invalid Content-Length header")
+        if length > self.server.max_body_bytes:
+            self._send_json(413, {"error": "Request body too large"})
+            self.close_connection = True
+            return None
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON body: {e}")
+        if not isinstance(payload, dict):
+            raise ValueError("JSON body must be an object")
+        return payload
+
+    def _send_json(self, status, body, headers=None):
+        self._send_text(status, json.dumps(body, cls=NumpyEncoder), "application/json", headers)
+
+    def _send_text(self, status, text, content_type, headers=None):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.server.draining:
+            self.send_header("Connection", "close")  # shutting down: don't keep the connection alive
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(f"{self.address_string()} - {format % args}")
+
+
+# ----------------------------------------------------------------------
+# PRE-FORK SUPERVISOR
+# ----------------------------------------------------------------------
+
+def _start_metrics_listener(host: str, port: int) -> None:
+    metrics_server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    metrics_server.daemon_threads = True
+    threading.Thread(target=metrics_server.serve_forever, name="metrics", daemon=True).start()
+
+
+def _run_worker(server: QueryServer, metrics_address=None) -> None:
+    """Child process: fresh LLM connections, then serve on the inherited socket"""
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever(), which runs on this (the main) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the parent, which sends SIGTERM
+    server.engine.llm.reconnect()
+    try:
+        if metrics_address:
+            _start_metrics_listener(*metrics_address)
+        server.serve_forever()
+        if not server.drain(server.request_timeout):
+            server.logger.warning(f"⚠️ Worker {os.getpid()} stopped with requests still in flight")
+    finally:
+        stop_logging()
+        os._exit(0)
+
+
+def serve(host: str, port: int, workers: int, metrics_port: int = 0, **server_options) -> None:
+    logger = get_logger(__name__)
+
+    # Models and indexes are loaded once here and shared copy-on-write by the forked workers.
+    # Nothing may run inference before forking (torch/OpenMP thread pools are not fork-safe).
+    engine = QueryEngine()
+    server = QueryServer((host, port), engine, **server_options)
+    logger.info(f"🌐 Serving on http://{host}:{port} with {workers} worker(s)")
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        # Windows has no fork(): a single threaded process
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    children = {}  # pid -> worker slot; a restarted worker keeps its slot and metrics port
+    stopping = False
+
+    def spawn(slot):
+        metrics_address = (host, metrics_port + slot) if metrics_port else None
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(server, metrics_address)
+        children[pid] = slot
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    if metrics_port:
+        logger.info(f"📈 Per-worker metrics on ports {metrics_port}-{metrics_port + workers - 1} (/metrics)")
+    for slot in range(workers):
+        spawn(slot)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if not stopping and slot is not None:
+            logger.warning(f"⚠️ Worker {pid} exited (status {status}), restarting")
+            spawn(slot)
+
+    server.server_close()
+    logger.info("🛑 Server stopped")
+
+
+def main():
+    config = ConfigManager()
+    parser = argparse.ArgumentParser(description="DocIntel HTTP query service")
+    parser.add_argument("--host", default=config.get("server.host", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(config.get("server.port", 8000)))
+    parser.add_argument("--workers", type=int, default=int(config.get("server.workers", 2)))
+    args = parser.parse_args()
+
+    serve(
+        args.host, args.port, args.workers,
+        metrics_port=int(config.get("server.metrics_port", 9100)),
+        max_inflight=int(config.get("server.max_inflight", 4)),
+        request_timeout=float(config.get("server.request_timeout", 60)),
+        keepalive_timeout=float(config.get("server.keepalive_timeout", 15)),
+        max_batch=int(config.get("server.max_batch", 32)),
+        max_body_bytes=int(config.get("server.max_body_bytes", 1024 * 1024)),
+        backlog=int(config.get("server.backlog", 128))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,44 +2,148 @@
 
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
-import numpy as np, os, pickle, faiss
+import numpy as np, os, pickle, faiss, shutil, uuid
+from datetime import datetime
 from logger import get_logger
+from src.hierarchical_index import build_centroid_index
+
+# Each build lives in data/index/<version>/; CURRENT names the live one
+INDEX_ROOT = "data/index"
+KEEP_BUILDS = 3  # older builds are deleted; keeps a margin for readers still loading one
+
+
+def current_build_dir(root=INDEX_ROOT):
+    """Directory of the live index build, or None if no versioned build exists yet"""
+    try:
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(root, version) if version else None
+
 
 class VectorStore:
     """Hugging Face API-based embedding vector store"""
 
     def __init__(self):
+        from logger.config_manager import ConfigManager
+        config = ConfigManager()
+
         load_dotenv()
         self.logger = get_logger(__name__)
         self.hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
         self.model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
-        self.index_path = "data/faiss_index.bin"
-        self.meta_path = "data/chunks_metadata.pkl"
+        self.index_root = INDEX_ROOT
+        # File names inside a build directory (and the pre-versioning layout under data/)
+        self.index_file = "faiss_index.bin"
+        self.meta_file = "chunks_metadata.pkl"
+        self.centroid_index_file = "centroid_index.bin"
+        self.centroid_groups_file = "centroid_groups.pkl"
+        self.legacy_dir = "data"
+        self.index_version = None
+        self._loaded_dir = None
+
+        # Coarse (document/page level) index built alongside the chunk index
+        self.hierarchical = bool(config.get("retrieval.hierarchical.enabled", False))
+        self.centroid_level = config.get("retrieval.hierarchical.level", "document")
 
         # Load model with token
         self.model = SentenceTransformer(self.model_name, use_auth_token=self.hf_token)
         self.logger.info(f"[OK] Loaded embedding model: {self.model_name}")
 
     def generate_embeddings(self, texts):
-        self.logger.info("[OK] Generating embeddings...")
+        self.logger.debug("[OK] Generating embeddings for %d text(s)...", len(texts))
         embeddings = self.model.encode(texts, convert_to_numpy=True)
         return np.array(embeddings, dtype="float32")
 
     def build_index(self, chunks, metadata):
+        """
+        Write a complete build (chunk index, metadata, optional centroid index) into a new
+        version directory, then switch CURRENT to it with one rename. Readers therefore
+        always load files from a single build.
+        """
         embeddings = self.generate_embeddings(chunks)
         index = faiss.IndexFlatL2(embeddings.shape[1])
         index.add(embeddings)
-        faiss.write_index(index, self.index_path)
-        with open(self.meta_path, "wb") as f:
+
+        # Sortable by build time, which is how old builds are pruned
+        version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        build_dir = os.path.join(self.index_root, version)
+        os.makedirs(build_dir)
+        faiss.write_index(index, os.path.join(build_dir, self.index_file))
+        with open(os.path.join(build_dir, self.meta_file), "wb") as f:
             pickle.dump(metadata, f)
-        self.logger.info("[OK] FAISS index built and saved")
+        if self.hierarchical:
+            self.build_centroid_index(embeddings, metadata, build_dir)
+
+        self._publish(version)
+        self.logger.info(f"[OK] FAISS index built and saved (version {version})")
+        return version
+
+    def build_centroid_index(self, embeddings, metadata, build_dir):
+        centroid_index, groups = build_centroid_index(embeddings, metadata, self.centroid_level)
+        faiss.write_index(centroid_index, os.path.join(build_dir, self.centroid_index_file))
+        with open(os.path.join(build_dir, self.centroid_groups_file), "wb") as f:
+            pickle.dump(groups, f)
+        self.logger.info(
+            f"[OK] {self.centroid_level.capitalize()}-level centroid index built "
+            f"({centroid_index.ntotal} centroids over {len(metadata)} chunks)"
+        )
+
+    def _publish(self, version):
+        """Point CURRENT at a finished build (atomic rename), then prune old builds"""
+        pointer = os.path.join(self.index_root, "CURRENT")
+        tmp_pointer = f"{pointer}.{uuid.uuid4().hex[:6]}.tmp"
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+
+        builds = sorted(
+            name for name in os.listdir(self.index_root)
+            if os.path.isdir(os.path.join(self.index_root, name))
+        )
+        for name in builds[:-KEEP_BUILDS]:
+            if name != version:
+                shutil.rmtree(os.path.join(self.index_root, name), ignore_errors=True)
+
+    def _resolve_build(self):
+        """(directory, version) of the live build, falling back to the unversioned data/ layout"""
+        build_dir = current_build_dir(self.index_root)
+        if build_dir is not None:
+            return build_dir, os.path.basename(build_dir)
+        legacy_meta = os.path.join(self.legacy_dir, self.meta_file)
+        if os.path.exists(legacy_meta):
+            stat = os.stat(legacy_meta)
+            return self.legacy_dir, f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        return None, None
 
     def load_index(self):
-        if os.path.exists(self.index_path):
-            index = faiss.read_index(self.index_path)
-            with open(self.meta_path, "rb") as f:
-                metadata = pickle.load(f)
-            self.logger.info("[OK] FAISS index loaded successfully")
-            return index, metadata
-        else:
+        build_dir, version = self._resolve_build()
+        if build_dir is None or not os.path.exists(os.path.join(build_dir, self.index_file)):
             raise FileNotFoundError("FAISS index not found.")
+
+        index = faiss.read_index(os.path.join(build_dir, self.index_file))
+        with open(os.path.join(build_dir, self.meta_file), "rb") as f:
+            metadata = pickle.load(f)
+        # Identifies this build of the index (chat logs reference chunks per version)
+        self.index_version = version
+        self._loaded_dir = build_dir
+        self.logger.info(f"[OK] FAISS index loaded successfully (version {version})")
+        return index, metadata
+
+    def load_centroid_index(self):
+        """
+        Load the coarse centroid index of the build last returned by load_index()
+        (or of the live build); returns (None, None) if that build has none.
+        """
+        build_dir = self._loaded_dir or self._resolve_build()[0]
+        index_path = os.path.join(build_dir or "", self.centroid_index_file)
+        groups_path = os.path.join(build_dir or "", self.centroid_groups_file)
+        if build_dir is None or not (os.path.exists(index_path) and os.path.exists(groups_path)):
+            self.logger.warning("[WARN] Centroid index not found, using flat chunk search")
+            return None, None
+        centroid_index = faiss.read_index(index_path)
+        with open(groups_path, "rb") as f:
+            groups = pickle.load(f)
+        self.logger.info(f"[OK] Centroid index loaded ({groups['level']} level, {centroid_index.ntotal} centroids)")
+        return centroid_index, groups
@@ -36,3 +36,84 @@ logs = db.get_chat_logs(limit=3)
 print("\n🧾 Recent chat logs:")
 for row in logs:
     print(row)
+
+# ---------------------------------------------------------
+# Storage format checks (temporary database)
+# ---------------------------------------------------------
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+print("\n🔍 Testing chat log storage format...\n")
+
+tmp_db = Database(os.path.join(tempfile.mkdtemp(), "format_test.db"))
+checks = {}
+
+def raw_row(log_id):
+    conn = sqlite3.connect(tmp_db.db_path)
+    row = conn.execute(
+        "SELECT answer, answer_codec, retrieved_chunks, citations FROM chat_logs WHERE id = ?", (log_id,)
+    ).fetchone()
+    conn.close()
+    return row
+
+# Compressed answer round trip
+long_answer = "TechVision Solutions drives digital innovation. " * 40
+chunks = [{"document": "test.pdf", "page": 1, "chunk_id": 0, "score": 0.9, "text": "Our mission is innovation."}]
+log_id = tmp_db.log_interaction("Mission?", chunks, long_answer, citations=chunks, index_version="v1")
+stored_answer, codec, stored_chunks, stored_citations = raw_row(log_id)
+checks["long answer is stored compressed"] = codec == tmp_db.compression and isinstance(stored_answer, bytes)
+checks["compressed answer reads back unchanged"] = tmp_db.get_chat_logs(limit=1)[0][2] == long_answer
+
+# Chunk refs: the log row holds only refs, reads resolve them back to chunks
+checks["log row stores refs, not chunk text"] = "text" not in stored_chunks and stored_citations is None
+resolved = json.loads(tmp_db.get_chat_logs(limit=1)[0][3])
+checks["refs resolve to document and text"] = (
+    resolved[0]["document"] == "test.pdf" and resolved[0]["text"] == "Our mission is innovation."
+)
+
+# The same text under a new index version is not stored again
+tmp_db.log_interaction("Mission again?", chunks, "Short answer.", citations=chunks, index_version="v2")
+conn = sqlite3.connect(tmp_db.db_path)
+text_rows = conn.execute("SELECT COUNT(*) FROM chunk_texts").fetchone()[0]
+chunk_rows = conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+conn.close()
+checks["chunk text is shared across index versions"] = text_rows == 1 and chunk_rows == 2
+
+# Legacy rows (full chunk dicts, uncompressed answer) still read back
+conn = sqlite3.connect(tmp_db.db_path)
+legacy = [{"document": "old.pdf", "page": 3, "chunk_id": 7, "text": "Legacy text"}]
+conn.execute("""
+    INSERT INTO chat_logs (timestamp, question, retrieved_chunks, answer, citations, execution_time)
+    VALUES (?, ?, ?, ?, ?, ?)
+""", ((datetime.now() + timedelta(seconds=5)).isoformat(), "Old question", json.dumps(legacy),
+      "Old answer", json.dumps(legacy), 0.1))
+conn.commit()
+conn.close()
+_, question, answer, citations, _ = tmp_db.get_chat_logs(limit=1)[0]
+checks["legacy full-dict row reads back"] = (
+    question == "Old question" and answer == "Old answer" and json.loads(citations) == legacy
+)
+
+# rollup_metrics merges into an hour that was already rolled up
+hour_start = (datetime.now() - timedelta(days=10)).replace(minute=0, second=0, microsecond=0)
+conn = sqlite3.connect(tmp_db.db_path)
+def add_metric(minute, value):
+    conn.execute("INSERT INTO system_metrics (timestamp, metric_name, metric_value) VALUES (?, ?, ?)",
+                 ((hour_start + timedelta(minutes=minute)).isoformat(), "latency.total.p95", value))
+    conn.commit()
+add_metric(5, 10.0)
+add_metric(10, 30.0)
+tmp_db.rollup_metrics(older_than_days=7)
+add_metric(20, 50.0)
+tmp_db.rollup_metrics(older_than_days=7)
+conn.close()
+hourly = tmp_db.get_hourly_metrics("latency.total.p95")
+checks["rollup merges into an existing hour"] = (
+    len(hourly) == 1 and hourly[0][1:] == (3, 30.0, 10.0, 50.0)
+)
+checks["rolled-up raw rows are deleted"] = tmp_db.get_metrics("latency.total.p95") == []
+
+for name, passed in checks.items():
+    print(f"{'✅' if passed else '❌'} {name}")
@@ -0,0 +1,38 @@
+# test_dedup.py
+
+from src.dedup import MinHashDeduplicator
+
+print("\n🔍 Testing MinHash near-duplicate detection...\n")
+
+# Defaults match the dedup section of config.yaml (threshold 0.9, 5-word shingles)
+dedup = MinHashDeduplicator()
+
+topics = ["data platforms", "cloud hosting", "model training", "customer support",
+          "security reviews", "billing", "onboarding", "incident response", "backups",
+          "network monitoring", "access control", "audit logging", "capacity planning",
+          "software updates", "vendor management", "staff training"]
+
+# A chunk-sized passage (chunks are up to 500 words; this one is ~400)
+original = " ".join(
+    f"Section {i} of the TechVision service agreement explains how {topic} is delivered, "
+    f"who owns each step and which report the customer receives every quarter."
+    for i, topic in enumerate(topics, start=1)
+)
+# A later revision of the same report: one word changed
+revision = original.replace("Section 5 of", "Section 5 in")
+unrelated = " ".join(
+    f"Quarter {i} revenue for {topic} grew while headcount stayed flat, "
+    f"and the hiring plan moves two roles into the next fiscal year."
+    for i, topic in enumerate(topics, start=1)
+)
+
+checks = {
+    "original is registered as canonical": dedup.find_or_add(original) is None,
+    "near-identical revision is aliased to it": dedup.find_or_add(revision) == 0,
+    "unrelated text is not aliased": dedup.find_or_add(unrelated) is None,
+    "unrelated text estimate is far below the threshold": dedup.similarity(
+        dedup.signature(original), dedup.signature(unrelated)) < 0.5,
+}
+
+for name, passed in checks.items():
+    print(f"{'✅' if passed else '❌'} {name}")
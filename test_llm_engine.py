@@ -0,0 +1,188 @@
+# test_llm_engine.py — LLMEngine resilience against a local fake Groq server
+#
+# Run with:  python test_llm_engine.py   (or: python -m pytest test_llm_engine.py)
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm_engine import LLMEngine, LLMError, CircuitOpenError
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    """OpenAI-compatible chat completions endpoint with scripted latency and failures"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeGroqHandler)
+        self.script = deque()      # (status, delay) per request; default is (200, 0)
+        self.requests = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def next_behaviour(self):
+        with self.lock:
+            self.requests += 1
+            return self.script.popleft() if self.script else (200, 0.0)
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status, delay = self.server.next_behaviour()
+        time.sleep(delay)
+
+        if status == 200:
+            payload = {
+                "id": "fake", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"answer after {delay}s"}}],
+            }
+        else:
+            payload = {"error": {"message": f"injected {status}", "type": "fake"}}
+
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_engine(server, **overrides):
+    os.environ["GROQ_API_KEY"] = "test-key"
+    os.environ["GROQ_BASE_URL"] = server.url
+    engine = LLMEngine()
+    engine.backoff_base = 0.01
+    engine.backoff_max = 0.05
+    for name, value in overrides.items():
+        setattr(engine, name, value)
+    server.requests = 0  # ignore the verification ping
+    return engine
+
+
+def test_retries_rate_limits_and_server_errors():
+    server = FakeGroqServer()
+    engine = make_engine(server)
+    server.script.extend([(429, 0), (500, 0), (503, 0)])
+
+    assert engine.generate("hello") == "answer after 0.0s"
+    assert server.requests == 4
+    assert engine.stats["retries"] == 3
+
+
+def test_client_errors_raise_instead_of_returning_error_text():
+    server = FakeGroqServer()
+    engine = make_engine(server)
+    server.script.append((400, 0))
+
+    try:
+        engine.generate("hello")
+        raise AssertionError("expected LLMError")
+    except LLMError:
+        pass
+    assert server.requests == 1  # 4xx other than 429 is not retried
+
+
+def test_identical_inflight_prompts_are_coalesced():
+    server = FakeGroqServer()
+    engine = make_engine(server)
+    server.script.append((200, 0.3))
+
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(engine.generate("same question")))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert answers == ["answer after 0.3s"] * 5
+    assert server.requests == 1
+    assert engine.stats["coalesced"] == 4
+
+
+def test_slow_request_is_hedged():
+    server = FakeGroqServer()
+    engine = make_engine(server, hedge_enabled=True, hedge_min_samples=5)
+    engine._latencies.extend([0.05] * 10)  # recent p95 = 50ms
+    server.script.extend([(200, 2.0), (200, 0.0)])
+
+    start = time.perf_counter()
+    answer = engine.generate("hedge me")
+    elapsed = time.perf_counter() - start
+
+    assert answer == "answer after 0.0s"
+    assert elapsed < 1.0
+    assert engine.stats["hedges"] == 1
+
+
+def test_circuit_breaker_fails_fast():
+    server = FakeGroqServer()
+    engine = make_engine(server, max_retries=0)
+    engine.breaker.failure_threshold = 2
+    server.script.extend([(500, 0), (500, 0)])
+
+    for _ in range(2):
+        try:
+            engine.generate("boom")
+        except LLMError:
+            pass
+
+    try:
+        engine.generate("boom")
+        raise AssertionError("expected CircuitOpenError")
+    except CircuitOpenError:
+        pass
+    assert server.requests == 2  # the third call never reached the server
+
+    engine.breaker.reset_timeout = 0  # half-open: one trial call closes it again
+    assert engine.generate("recovered") == "answer after 0.0s"
+    assert engine.breaker.state == "closed"
+
+
+def test_half_open_trial_with_client_error_settles_breaker():
+    server = FakeGroqServer()
+    engine = make_engine(server, max_retries=0)
+    engine.breaker.failure_threshold = 1
+    server.script.extend([(500, 0), (400, 0)])
+
+    try:
+        engine.generate("boom")
+    except LLMError:
+        pass
+    assert engine.breaker.state == "open"
+
+    engine.breaker.reset_timeout = 0
+    try:
+        engine.generate("bad request")  # the half-open trial gets a 400
+        raise AssertionError("expected LLMError")
+    except CircuitOpenError:
+        raise AssertionError("the trial call should have reached the server")
+    except LLMError:
+        pass
+    assert engine.breaker.state == "closed"
+    assert engine.generate("next") == "answer after 0.0s"
+
+
+if __name__ == "__main__":
+    print("\n🔍 Testing LLMEngine against a local fake Groq server...\n")
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")